@@ -0,0 +1,313 @@
+"""Procesamiento por lotes de exportaciones de checadas sin interfaz gráfica.
+
+Uso:
+    python batch.py RUTA_O_PATRON [RUTA_O_PATRON ...] [-o CARPETA] [-w N]
+
+Cada argumento puede ser una carpeta (se procesan sus archivos .xlsx, .xls,
+.csv y .parquet) o un patrón glob. Con ``--format csv|parquet|jsonl`` se
+escriben las tablas "Detalle" y "Resumen" en archivos separados en lugar del
+libro de Excel. Se genera un reporte por archivo y un manifiesto JSON con el
+tiempo y el error (si lo hubo) de cada uno.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from expected_hours import load_expected_hours_data
+from instrumentation import Instrumentation, JsonLinesSink
+from report import DEFAULT_WORKDAY_CUTOFF, EXCEL_STYLE_MODES, OUTPUT_FORMATS, REPORT_SHEETS, generate_report
+
+REPORT_STEM = "_reporte"
+INPUT_EXTENSIONS = (".xlsx", ".xls", ".csv", ".parquet")
+
+_worker_expected_hours = None
+
+
+def collect_inputs(patterns):
+    """Expande carpetas y patrones glob en una lista ordenada de archivos."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern)
+        for path in candidates:
+            name = os.path.basename(path)
+            if (
+                os.path.isfile(path)
+                and name.lower().endswith(INPUT_EXTENSIONS)
+                and not name.startswith("~$")
+                and not _is_report_output(name)
+            ):
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def _is_report_output(name):
+    stem = os.path.splitext(name)[0]
+    return stem.endswith((REPORT_STEM, *(f"{REPORT_STEM}_{suffix}" for suffix in REPORT_SHEETS.values())))
+
+
+def output_path_for(src, output_dir=None, output_format="xlsx"):
+    stem = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(
+        output_dir or os.path.dirname(src), stem + REPORT_STEM + OUTPUT_FORMATS[output_format]
+    )
+
+
+def _init_worker(expected_hours_df):
+    global _worker_expected_hours
+    _worker_expected_hours = expected_hours_df
+
+
+def _process_file(
+    src,
+    dst,
+    max_checadas=None,
+    use_input_cache=True,
+    timings_path=None,
+    workday_cutoff=DEFAULT_WORKDAY_CUTOFF,
+    shift_cutoffs=None,
+    start_date=None,
+    end_date=None,
+    output_format="xlsx",
+    report_workers=1,
+    punch_store=None,
+    use_result_cache=True,
+    excel_styles="cells",
+):
+    started = time.perf_counter()
+    entry = {"input": src, "output": dst}
+    instrumentation = None
+    if timings_path:
+        instrumentation = Instrumentation(JsonLinesSink(timings_path, input=src))
+    try:
+        resumen_df = generate_report(
+            src,
+            dst,
+            _worker_expected_hours,
+            max_checadas=max_checadas,
+            use_input_cache=use_input_cache,
+            instrumentation=instrumentation,
+            workday_cutoff=workday_cutoff,
+            shift_cutoffs=shift_cutoffs,
+            start_date=start_date,
+            end_date=end_date,
+            output_format=output_format,
+            workers=report_workers,
+            punch_store=punch_store,
+            use_result_cache=use_result_cache,
+            excel_styles=excel_styles,
+        )
+        entry["status"] = "ok"
+        entry["input_cache"] = resumen_df.attrs.get("input_cache")
+        entry["result_cache"] = resumen_df.attrs.get("result_cache")
+        if "punch_store" in resumen_df.attrs:
+            entry["punch_store"] = resumen_df.attrs["punch_store"]
+        if "outputs" in resumen_df.attrs:
+            entry["output"] = resumen_df.attrs["outputs"]
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    entry["seconds"] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+def run_batch(
+    inputs,
+    output_dir=None,
+    workers=1,
+    max_checadas=None,
+    use_input_cache=True,
+    timings_path=None,
+    workday_cutoff=DEFAULT_WORKDAY_CUTOFF,
+    shift_cutoffs=None,
+    start_date=None,
+    end_date=None,
+    output_format="xlsx",
+    report_workers=1,
+    punch_store=None,
+    use_result_cache=True,
+    excel_styles="cells",
+):
+    """Genera un reporte por archivo y devuelve el manifiesto como dict.
+
+    La tabla de horas esperadas se carga una sola vez y se entrega a cada
+    proceso del pool al iniciarlo. Con ``punch_store`` los archivos se
+    procesan en orden y en serie, para que cada reporte vea en el almacén
+    exactamente las exportaciones anteriores a él.
+    """
+    started_at = datetime.now().isoformat()
+    started = time.perf_counter()
+    expected_hours_df = load_expected_hours_data()
+    jobs = [(src, output_path_for(src, output_dir, output_format)) for src in inputs]
+    options = {
+        "workday_cutoff": workday_cutoff,
+        "shift_cutoffs": shift_cutoffs,
+        "start_date": start_date,
+        "end_date": end_date,
+        "output_format": output_format,
+        "report_workers": report_workers,
+        "punch_store": punch_store,
+        "use_result_cache": use_result_cache,
+        "excel_styles": excel_styles,
+    }
+
+    if workers <= 1 or len(jobs) <= 1 or punch_store:
+        _init_worker(expected_hours_df)
+        results = [
+            _process_file(src, dst, max_checadas, use_input_cache, timings_path, **options)
+            for src, dst in jobs
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(expected_hours_df,),
+        ) as pool:
+            futures = [
+                pool.submit(
+                    _process_file, src, dst, max_checadas, use_input_cache, timings_path, **options
+                )
+                for src, dst in jobs
+            ]
+            results = [future.result() for future in as_completed(futures)]
+        results.sort(key=lambda entry: entry["input"])
+
+    return {
+        "started": started_at,
+        "workers": workers,
+        "expected_hours_loaded": expected_hours_df is not None,
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "files": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera reportes de checadas por lotes.")
+    parser.add_argument("inputs", nargs="+", help="Carpetas o patrones glob de exportaciones")
+    parser.add_argument("-o", "--output-dir", help="Carpeta de salida (por defecto, junto a cada archivo)")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count() or 1, help="Número de procesos en paralelo"
+    )
+    parser.add_argument("-m", "--manifest", help="Ruta del manifiesto JSON (por defecto, en la carpeta de salida)")
+    parser.add_argument("--max-checadas", type=int, help="Número máximo de columnas 'Checada N'")
+    parser.add_argument("--no-cache", action="store_true", help="No usar la caché de archivos de entrada")
+    parser.add_argument(
+        "--no-result-cache",
+        action="store_true",
+        help="Volver a generar los reportes aunque ya estén en la caché de reportes",
+    )
+    parser.add_argument("--timings", help="Archivo JSON-lines donde registrar los tiempos por etapa")
+    parser.add_argument(
+        "--cutoff",
+        default=DEFAULT_WORKDAY_CUTOFF.strftime("%H:%M"),
+        help="Hora de corte de la jornada: las checadas anteriores cuentan para el día anterior",
+    )
+    parser.add_argument(
+        "--shift-cutoff",
+        action="append",
+        default=[],
+        metavar="TURNO=HH:MM",
+        help="Hora de corte para un turno específico (se puede repetir)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(OUTPUT_FORMATS),
+        default="xlsx",
+        help="Formato de salida: libro de Excel o tablas Detalle/Resumen en CSV, Parquet o JSON-lines",
+    )
+    parser.add_argument(
+        "--excel-styles",
+        choices=EXCEL_STYLE_MODES,
+        default="cells",
+        help="Estilos del libro: por celda o con formato condicional (archivo más chico)",
+    )
+    parser.add_argument(
+        "--report-workers",
+        type=int,
+        default=1,
+        help="Procesos para repartir por empleado un mismo reporte grande",
+    )
+    parser.add_argument(
+        "--store",
+        help="Almacén SQLite de checadas: solo se recalculan las jornadas con checadas nuevas",
+    )
+    parser.add_argument("--start", type=_parse_date, help="Primera jornada del periodo (AAAA-MM-DD)")
+    parser.add_argument("--end", type=_parse_date, help="Última jornada del periodo (AAAA-MM-DD)")
+    return parser.parse_args(argv)
+
+
+def _parse_date(text):
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Fecha inválida: '{text}' (use AAAA-MM-DD)") from None
+
+
+def parse_shift_cutoffs(values):
+    """Convierte ``["Turno=HH:MM", ...]`` en ``{"Turno": "HH:MM"}``."""
+    shift_cutoffs = {}
+    for value in values:
+        shift, sep, cutoff = value.rpartition("=")
+        if not sep or not shift:
+            raise ValueError(f"Formato inválido para --shift-cutoff: '{value}' (use TURNO=HH:MM)")
+        shift_cutoffs[shift] = cutoff
+    return shift_cutoffs or None
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("No se encontraron archivos de checadas para procesar.", file=sys.stderr)
+        return 2
+
+    try:
+        shift_cutoffs = parse_shift_cutoffs(args.shift_cutoff)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    manifest = run_batch(
+        inputs,
+        args.output_dir,
+        args.workers,
+        args.max_checadas,
+        use_input_cache=not args.no_cache,
+        timings_path=args.timings,
+        workday_cutoff=args.cutoff,
+        shift_cutoffs=shift_cutoffs,
+        start_date=args.start,
+        end_date=args.end,
+        output_format=args.format,
+        report_workers=args.report_workers,
+        punch_store=args.store,
+        use_result_cache=not args.no_result_cache,
+        excel_styles=args.excel_styles,
+    )
+
+    manifest_path = args.manifest or os.path.join(
+        args.output_dir or os.getcwd(), f"manifest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    errors = [entry for entry in manifest["files"] if entry["status"] != "ok"]
+    print(
+        f"{len(manifest['files']) - len(errors)} reportes generados, {len(errors)} con error "
+        f"en {manifest['total_seconds']} s. Manifiesto: {manifest_path}"
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":  # pragma: no cover - entry point
+    sys.exit(main())
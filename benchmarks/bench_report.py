@@ -0,0 +1,210 @@
+"""Benchmark de escalamiento de ``generate_report`` y ``format_excel``.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_report --sizes 100x30x4,1000x30x4
+    python -m benchmarks.bench_report --save-baseline
+    python -m benchmarks.bench_report --compare
+
+Cada tamaño es ``empleadosxdíasxchecadas_por_día``. Para cada etapa se
+registra el tiempo de reloj y el pico de memoria asignada (tracemalloc), y el
+tamaño del libro generado. ``--excel-styles`` elige el modo de estilos del
+libro (ver ``report.EXCEL_STYLE_MODES``). Con
+``--compare`` se comparan los tiempos contra la línea base guardada y el
+proceso termina con código 1 si alguna etapa empeora más de la tolerancia.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_expected_hours, generate_punches, write_export
+from report import EXCEL_STYLE_MODES, format_excel, generate_report
+
+DEFAULT_SIZES = "100x30x4,500x30x4,1000x30x4"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Las etapas más cortas que esto no se comparan: su variación es puro ruido
+MIN_COMPARED_SECONDS = 0.05
+
+
+class StageRecorder:
+    """Callback de progreso que mide tiempo y pico de memoria por etapa."""
+
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.stages = {}
+        self._current = None
+        self._started = None
+
+    def __call__(self, stage):
+        if stage == self._current:
+            return
+        self.finish()
+        self._current = stage
+        self._started = time.perf_counter()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+
+    def finish(self):
+        if self._current is None:
+            return
+        entry = {"seconds": round(time.perf_counter() - self._started, 4)}
+        if self.track_memory:
+            entry["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        self.stages[self._current] = entry
+        self._current = None
+
+
+def parse_size(text):
+    employees, days, punches = (int(part) for part in text.lower().split("x"))
+    return employees, days, punches
+
+
+def write_unstyled_copy(src, dst):
+    """Copia los valores de las hojas de ``src`` en un libro nuevo sin estilos.
+
+    ``format_excel`` se mide sobre esta copia, igual que sobre un libro
+    recién escrito sin formato.
+    """
+    sheets = pd.read_excel(src, sheet_name=None)
+    with pd.ExcelWriter(dst, engine="openpyxl") as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return dst
+
+
+def run_size(size, seed=0, track_memory=True, workdir=None, excel_styles="cells"):
+    employees, days, punches = size
+    punches_df = generate_punches(employees, days, punches, seed=seed)
+    expected_df = generate_expected_hours(employees)
+
+    src = write_export(punches_df, os.path.join(workdir, f"checadas_{employees}x{days}x{punches}.xlsx"))
+    dst = os.path.join(workdir, f"reporte_{employees}x{days}x{punches}.xlsx")
+
+    recorder = StageRecorder(track_memory)
+    if track_memory:
+        tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        resumen_df = generate_report(
+            src,
+            dst,
+            expected_df,
+            progress=recorder,
+            use_input_cache=False,
+            use_result_cache=False,
+            excel_styles=excel_styles,
+        )
+        recorder.finish()
+        total = time.perf_counter() - started
+        output_bytes = os.path.getsize(dst)
+        # La copia sin estilos no se cuenta en el tiempo total
+        unstyled = os.path.join(workdir, f"sin_formato_{employees}x{days}x{punches}.xlsx")
+        write_unstyled_copy(dst, unstyled)
+        started = time.perf_counter()
+        recorder("format_excel")
+        format_excel(unstyled, resumen_df, style_mode=excel_styles)
+        recorder.finish()
+        total += time.perf_counter() - started
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+
+    return {
+        "size": f"{employees}x{days}x{punches}",
+        "punches": len(punches_df),
+        "total_seconds": round(total, 4),
+        "output_bytes": output_bytes,
+        "stages": recorder.stages,
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Devuelve la lista de etapas que empeoraron más que ``tolerance``."""
+    regressions = []
+    baseline_by_size = {entry["size"]: entry for entry in baseline.get("results", [])}
+    for entry in results:
+        base = baseline_by_size.get(entry["size"])
+        if base is None:
+            continue
+        pairs = [("total", entry["total_seconds"], base["total_seconds"])]
+        for stage, measured in entry["stages"].items():
+            if stage in base["stages"]:
+                pairs.append((stage, measured["seconds"], base["stages"][stage]["seconds"]))
+        for stage, current, previous in pairs:
+            if previous >= MIN_COMPARED_SECONDS and current > previous * (1 + tolerance):
+                regressions.append(
+                    f"{entry['size']} {stage}: {current:.3f}s (línea base {previous:.3f}s)"
+                )
+    return regressions
+
+
+def print_results(results):
+    for entry in results:
+        print(f"\n{entry['size']} ({entry['punches']} checadas) - total {entry['total_seconds']:.3f}s")
+        if "output_bytes" in entry:
+            print(f"  {'libro':<16}{entry['output_bytes'] / 2**20:>8.2f} MB")
+        for stage, measured in entry["stages"].items():
+            peak = f"  pico {measured['peak_mb']:.1f} MB" if "peak_mb" in measured else ""
+            print(f"  {stage:<16}{measured['seconds']:>9.3f}s{peak}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del reporte de checadas.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Tamaños separados por coma (EMPxDÍASxCHECADAS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="No medir memoria (más rápido)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Archivo JSON de la línea base")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como línea base")
+    parser.add_argument("--compare", action="store_true", help="Comparar contra la línea base")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Empeoramiento permitido (0.25 = 25%%)")
+    parser.add_argument("--output", help="Guardar los resultados en este archivo JSON")
+    parser.add_argument("--excel-styles", choices=EXCEL_STYLE_MODES, default="cells", help="Modo de estilos del libro")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sizes = [parse_size(text) for text in args.sizes.split(",") if text.strip()]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [
+            run_size(size, args.seed, not args.no_memory, workdir, args.excel_styles) for size in sizes
+        ]
+    print_results(results)
+
+    payload = {"seed": args.seed, "excel_styles": args.excel_styles, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"\nLínea base guardada en {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(
+                f"\nError: no existe la línea base '{args.baseline}'. Use --save-baseline primero.",
+                file=sys.stderr,
+            )
+            return 2
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegresiones de rendimiento:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nSin regresiones respecto a la línea base.")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - entry point
+    sys.exit(main())
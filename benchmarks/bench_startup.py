@@ -0,0 +1,125 @@
+"""Tiempo hasta la primera ventana de la aplicación.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 5 --max-seconds 1.5
+
+Lanza un intérprete nuevo con ``-X importtime`` que ejecuta
+``main.create_app()`` (la misma ruta que ``main.py``) y cierra la ventana en
+cuanto se muestra. Informa el tiempo hasta la ventana, las importaciones más
+costosas y los módulos pesados que se cargaron antes de mostrarla. Termina con
+código 1 si se excede ``--max-seconds`` o si algún módulo pesado se importó
+antes de la ventana. Sin pantalla disponible solo se mide la importación.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que deben cargarse después de mostrar la ventana
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl", "requests", "dotenv", "report", "expected_hours"]
+
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter() - started
+window = None
+try:
+    root, app = main.create_app()
+    window = time.perf_counter() - started
+except Exception as e:
+    error = str(e)
+else:
+    error = None
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"import_seconds": imported, "window_seconds": window, "heavy": heavy, "error": error}}))
+sys.stdout.flush()
+if window is not None:
+    root.destroy()
+"""
+
+
+def parse_importtime(stderr, top=10):
+    """Importaciones de primer nivel ordenadas por tiempo acumulado (segundos).
+
+    Cada línea de ``-X importtime`` tiene la forma
+    ``import time: self [us] | cumulative | módulo``; las importaciones
+    anidadas llevan el nombre sangrado.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        name = name[1:]
+        if name.startswith(" "):
+            continue
+        entries.append((name, int(cumulative_us) / 1e6))
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    return entries[:top]
+
+
+def run_once():
+    script = CHILD_SCRIPT.format(heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+    )
+    process_seconds = time.perf_counter() - started
+    if completed.returncode != 0 or not completed.stdout.strip():
+        raise RuntimeError(f"No se pudo iniciar la aplicación:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = process_seconds
+    result["top_imports"] = parse_importtime(completed.stderr)
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el tiempo hasta la primera ventana.")
+    parser.add_argument("--runs", type=int, default=3, help="Repeticiones; se informa la más rápida")
+    parser.add_argument("--max-seconds", type=float, help="Límite para el tiempo hasta la ventana")
+    parser.add_argument("--output", help="Guardar el resultado en este archivo JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = [run_once() for _ in range(max(args.runs, 1))]
+    measured_key = "window_seconds" if results[0]["window_seconds"] is not None else "import_seconds"
+    best = min(results, key=lambda result: result[measured_key])
+
+    if best["window_seconds"] is None:
+        print(f"Sin pantalla ({best['error']}); solo se mide la importación de main.")
+    else:
+        print(f"Tiempo hasta la ventana: {best['window_seconds']:.3f}s")
+    print(f"Importación de main:     {best['import_seconds']:.3f}s")
+    print(f"Proceso completo:        {best['process_seconds']:.3f}s")
+    print("\nImportaciones más costosas:")
+    for name, seconds in best["top_imports"]:
+        print(f"  {name:<30}{seconds:>8.3f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": results, "best": best}, f, indent=2)
+
+    failed = False
+    if best["heavy"]:
+        print(f"\nMódulos pesados cargados antes de la ventana: {', '.join(best['heavy'])}")
+        failed = True
+    if args.max_seconds is not None and best[measured_key] > args.max_seconds:
+        print(f"\n{measured_key} excede el límite de {args.max_seconds:.3f}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":  # pragma: no cover - entry point
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Benchmark de la descarga paginada de horas esperadas.
+
+Levanta el servidor simulado de NocoDB con latencia por solicitud y mide el
+tiempo total de ``expected_hours._fetch_records`` con distintas
+combinaciones de tamaño de página y páginas simultáneas.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_sync --records 5000 --latency 0.05
+"""
+
+import argparse
+import sys
+import time
+
+import expected_hours
+from benchmarks.mock_nocodb import MockNocoDB, make_records
+
+DEFAULT_CONFIGS = "100x1,100x4,100x8,500x4"
+
+
+def run_config(server, page_size, concurrency):
+    requests_before = len(server.request_log)
+    started = time.perf_counter()
+    records = expected_hours._fetch_records(page_size=page_size, concurrency=concurrency)
+    elapsed = time.perf_counter() - started
+    return {
+        "page_size": page_size,
+        "concurrency": concurrency,
+        "records": len(records),
+        "requests": len(server.request_log) - requests_before,
+        "seconds": round(elapsed, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de la descarga de horas esperadas.")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Segundos de latencia por solicitud")
+    parser.add_argument("--fail-every", type=int, default=0, help="Responder 503 cada N solicitudes")
+    parser.add_argument(
+        "--configs", default=DEFAULT_CONFIGS, help="Combinaciones TAMAÑOxSIMULTÁNEAS separadas por coma"
+    )
+    args = parser.parse_args(argv)
+
+    configs = [tuple(int(part) for part in text.split("x")) for text in args.configs.split(",")]
+    server = MockNocoDB(make_records(args.records), latency=args.latency, fail_every=args.fail_every)
+    with server:
+        expected_hours.API_URL = server.url
+        expected_hours.TABLE = server.table
+        results = [run_config(server, page_size, concurrency) for page_size, concurrency in configs]
+
+    reference = results[0]["seconds"]
+    print(f"\n{args.records} registros, latencia {args.latency * 1000:.0f} ms por solicitud")
+    for result in results:
+        speedup = reference / result["seconds"] if result["seconds"] else float("inf")
+        print(
+            f"  página {result['page_size']:>5}  simultáneas {result['concurrency']:>2}  "
+            f"{result['requests']:>4} solicitudes  {result['seconds']:>7.3f}s  x{speedup:.1f}"
+        )
+    if any(result["records"] != args.records for result in results):
+        print("Error: alguna configuración no descargó todos los registros.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - entry point
+    sys.exit(main())
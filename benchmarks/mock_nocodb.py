@@ -0,0 +1,192 @@
+"""Servidor local que imita el endpoint de registros de NocoDB.
+
+Implementa ``GET /api/v2/tables/{TABLE}/records`` con ``offset``/``limit``,
+``pageInfo``, ``fields`` y el filtro ``where=(Campo,op,exactDate,AAAA-MM-DD)``
+sobre el campo de fecha de modificación. Sirve para probar la sincronización de horas
+esperadas sin acceso a la API real, con latencia opcional por solicitud.
+
+Uso:
+    with MockNocoDB(make_records(500), latency=0.05) as server:
+        expected_hours.API_URL = server.url
+        expected_hours.TABLE = server.table
+        ...
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DAY_KEYS = ["L", "M", "X", "J", "V", "S", "D"]
+WHERE_PATTERN = re.compile(r"^\((?P<field>[^,]+),(?P<op>eq|gt|ge|lt|le),exactDate,(?P<date>[0-9-]+)\)$")
+
+
+def make_records(employees=500, seconds_per_day=32400, updated_at="2025-01-01 00:00:00+00:00"):
+    """Registros con jornada de lunes a viernes en el formato de la API."""
+    return [
+        {
+            "Id": emp,
+            "Employee": emp,
+            **{key: (seconds_per_day if key not in ("S", "D") else 0) for key in DAY_KEYS},
+            "UpdatedAt": updated_at,
+        }
+        for emp in range(1, employees + 1)
+    ]
+
+
+def _now_string():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S+00:00")
+
+
+class MockNocoDB:
+    """Servidor HTTP en un hilo con los registros en memoria."""
+
+    def __init__(self, records=None, table="expected_hours", latency=0.0, max_limit=1000, fail_every=0):
+        self.records = list(records or [])
+        self.table = table
+        self.latency = latency
+        self.max_limit = max_limit
+        # Si es N > 0, cada N-ésima solicitud responde 503 (para probar reintentos)
+        self.fail_every = fail_every
+        self.request_log = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def update_record(self, employee, **values):
+        """Modifica (o agrega) un registro y actualiza su fecha de modificación."""
+        with self._lock:
+            for record in self.records:
+                if record["Employee"] == employee:
+                    record.update(values)
+                    record["UpdatedAt"] = _now_string()
+                    return
+            record = {"Id": employee, "Employee": employee, **{key: 0 for key in DAY_KEYS}}
+            record.update(values)
+            record["UpdatedAt"] = _now_string()
+            self.records.append(record)
+
+    def delete_record(self, employee):
+        with self._lock:
+            self.records = [r for r in self.records if r["Employee"] != employee]
+
+    def _select(self, where):
+        if not where:
+            return list(self.records)
+        match = WHERE_PATTERN.match(where)
+        if match is None:
+            raise ValueError(f"Filtro no soportado: {where}")
+        field, op, date = match.group("field"), match.group("op"), match.group("date")
+        compare = {
+            "eq": lambda a, b: a == b,
+            "gt": lambda a, b: a > b,
+            "ge": lambda a, b: a >= b,
+            "lt": lambda a, b: a < b,
+            "le": lambda a, b: a <= b,
+        }[op]
+        return [r for r in self.records if compare(str(r.get(field, ""))[:10], date)]
+
+    def _handle(self, handler):
+        parsed = urlparse(handler.path)
+        if parsed.path != f"/api/v2/tables/{self.table}/records":
+            handler.send_error(404)
+            return
+        query = {key: values[-1] for key, values in parse_qs(parsed.query, keep_blank_values=True).items()}
+        with self._lock:
+            self.request_log.append(query)
+            request_number = len(self.request_log)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and request_number % self.fail_every == 0:
+            handler.send_error(503, "Falla simulada")
+            return
+        try:
+            offset = int(query.get("offset", 0))
+            limit = min(int(query.get("limit", 25)), self.max_limit)
+            with self._lock:
+                selected = self._select(query.get("where", ""))
+        except ValueError as e:
+            handler.send_error(400, str(e))
+            return
+        page = selected[offset:offset + limit]
+        if query.get("fields"):
+            fields = query["fields"].split(",")
+            page = [{field: record[field] for field in fields if field in record} for record in page]
+        body = json.dumps(
+            {
+                "list": page,
+                "pageInfo": {
+                    "totalRows": len(selected),
+                    "page": offset // limit + 1 if limit else 1,
+                    "pageSize": limit,
+                    "isFirstPage": offset == 0,
+                    "isLastPage": offset + limit >= len(selected),
+                },
+            }
+        ).encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self, host="127.0.0.1", port=0):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                mock._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de NocoDB.")
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos de espera por solicitud")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--table", default="expected_hours")
+    args = parser.parse_args(argv)
+
+    server = MockNocoDB(make_records(args.employees), table=args.table, latency=args.latency)
+    server.start(port=args.port)
+    print(f"NocoDB simulado en {server.url} (tabla '{args.table}'). Ctrl+C para salir.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":  # pragma: no cover - entry point
+    main()
@@ -0,0 +1,104 @@
+"""Generador reproducible de exportaciones de checadas sintéticas.
+
+Produce tablas con la misma forma que las exportaciones reales de Frappe HR
+("Employee", "Employee Name", "Time", "Shift", ...), incluyendo turnos
+nocturnos con checadas antes de las 06:00 y checadas sin turno.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+DAY_SHIFT = "Matutino 08:00-17:00"
+NIGHT_SHIFT = "Nocturno 22:00-06:00"
+
+EXPORT_COLUMNS = [
+    "Sr",
+    "ID",
+    "Employee Name",
+    "Employee",
+    "Log Type",
+    "Shift",
+    "Time",
+    "Off-Shift",
+    "owner",
+]
+
+
+def generate_punches(
+    employees=100,
+    days=30,
+    punches_per_day=4,
+    seed=0,
+    night_share=0.2,
+    missing_shift_share=0.1,
+    absence_share=0.1,
+    start=datetime.date(2025, 1, 1),
+):
+    """Genera una exportación sintética de checadas.
+
+    Cada empleado trabaja un turno diurno (08:00-17:00) o nocturno
+    (22:00-06:00) y checa ``punches_per_day`` veces en cada día en que no
+    falta. Una fracción ``missing_shift_share`` de las checadas queda sin
+    turno, como ocurre en las exportaciones reales.
+    """
+    rng = np.random.default_rng(seed)
+
+    emp_ids = np.arange(1, employees + 1)
+    is_night = rng.random(employees) < night_share
+    day_index = np.arange(days)
+
+    emp_grid, day_grid = np.meshgrid(np.arange(employees), day_index, indexing="ij")
+    present = rng.random(emp_grid.shape) >= absence_share
+    emp_of_day = emp_grid[present]
+    day_of_day = day_grid[present]
+
+    emp = np.repeat(emp_of_day, punches_per_day)
+    day = np.repeat(day_of_day, punches_per_day)
+    slot = np.tile(np.arange(punches_per_day), len(emp_of_day))
+
+    night = is_night[emp]
+    shift_start = np.where(night, 22 * 3600, 8 * 3600)
+    shift_length = np.where(night, 8 * 3600, 9 * 3600)
+    spacing = shift_length // max(punches_per_day - 1, 1)
+    jitter = rng.integers(-15 * 60, 15 * 60, len(emp))
+    offset_seconds = shift_start + slot * spacing + jitter
+
+    base = np.datetime64(start, "s") + day.astype("timedelta64[D]")
+    times = base + offset_seconds.astype("timedelta64[s]")
+
+    shift = np.where(night, NIGHT_SHIFT, DAY_SHIFT).astype(object)
+    shift[rng.random(len(emp)) < missing_shift_share] = np.nan
+
+    n = len(emp)
+    return pd.DataFrame(
+        {
+            "Sr": np.arange(1, n + 1),
+            "ID": [f"EMP-CKIN-{i:07d}" for i in range(1, n + 1)],
+            "Employee Name": [f"Empleado {emp_ids[e]:05d}" for e in emp],
+            "Employee": emp_ids[emp],
+            "Log Type": np.where(slot % 2 == 0, "IN", "OUT"),
+            "Shift": shift,
+            "Time": pd.to_datetime(times),
+            "Off-Shift": 0,
+            "owner": "admin@example.com",
+        },
+        columns=EXPORT_COLUMNS,
+    )
+
+
+def generate_expected_hours(employees=100, seconds_per_day=32400):
+    """Tabla de horas esperadas con jornada de lunes a viernes para cada empleado."""
+    weekdays = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+    df = pd.DataFrame({"Employee": np.arange(1, employees + 1)})
+    for day in weekdays:
+        df[day] = seconds_per_day
+    df["Sábado"] = 0
+    df["Domingo"] = 0
+    return df
+
+
+def write_export(df, path):
+    df.to_excel(path, index=False)
+    return path
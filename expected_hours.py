@@ -1,10 +1,16 @@
 import os
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
 import hashlib
 import json
-from datetime import datetime
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 # Carga variables de entorno
 load_dotenv()  # Carga las variables desde .env
@@ -12,52 +18,296 @@ API_URL     = os.getenv("NOCODB_API_URL")
 API_KEY     = os.getenv("NOCODB_API_KEY")
 PROJECT     = os.getenv("NOCODB_PROJECT_ID")
 TABLE       = os.getenv("NOCODB_TABLE_NAME")
+# Campo de sistema de NocoDB con la fecha de última modificación del registro
+UPDATED_FIELD = os.getenv("NOCODB_UPDATED_FIELD", "UpdatedAt")
+
+# Parámetros de descarga: tamaño de página, páginas simultáneas, tiempo límite
+# (conexión, lectura) en segundos y reintentos con backoff exponencial
+PAGE_SIZE = int(os.getenv("NOCODB_PAGE_SIZE", "100"))
+PAGES_IN_FLIGHT = int(os.getenv("NOCODB_PAGES_IN_FLIGHT", "4"))
+REQUEST_TIMEOUT = (5, 30)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+_session = None
+_session_pool_size = 0
 
 # Nombre del archivo local para almacenar los datos
 LOCAL_DATA_FILE = "expected_hours_data.csv"
 LOCAL_METADATA_FILE = "expected_hours_metadata.json"
+# Copia binaria validada del CSV, junto a él
+BINARY_CACHE_FILE = "expected_hours_data.cache.npz"
+# Los archivos locales viven junto a este módulo, sin importar el directorio actual
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+LOCAL_DATA_PATH = os.path.join(BASE_PATH, LOCAL_DATA_FILE)
+LOCAL_METADATA_PATH = os.path.join(BASE_PATH, LOCAL_METADATA_FILE)
+
+# Columnas de días en el orden de datetime.weekday() (0 = lunes)
+DAY_COLUMNS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+SHORT_TO_FULL_DAY = dict(zip(["L", "M", "X", "J", "V", "S", "D"], DAY_COLUMNS))
+
+# Días tras los cuales la sincronización incremental fuerza una descarga completa
+FULL_RESYNC_DAYS = 7
+
+def _expected_hours_paths():
+    return (
+        LOCAL_DATA_PATH,
+        LOCAL_METADATA_PATH,
+        os.path.join(BASE_PATH, BINARY_CACHE_FILE),
+    )
+
+def expected_hours_signature():
+    """
+    Firma del CSV de horas esperadas: (mtime_ns, tamaño, hash de metadatos).
+    Devuelve None si el CSV no existe.
+    """
+    csv_path, metadata_path, _ = _expected_hours_paths()
+    try:
+        stat = os.stat(csv_path)
+    except OSError:
+        return None
+    data_hash = ""
+    try:
+        with open(metadata_path, "r") as f:
+            data_hash = json.load(f).get("data_hash") or ""
+    except (OSError, ValueError):
+        pass
+    return (stat.st_mtime_ns, stat.st_size, data_hash)
 
-def load_expected_hours_data():
-    """Carga el archivo CSV local con las horas esperadas."""
+def _load_binary_cache(signature):
+    _, _, cache_path = _expected_hours_paths()
     try:
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        expected_hours_path = os.path.join(base_path, "expected_hours_data.csv")
-        if os.path.exists(expected_hours_path):
-            with open(expected_hours_path, "r", encoding="utf-8") as f:
-                first_line = f.readline().strip()
-                skip_rows = 1 if first_line.startswith("//") else 0
-            df_expected = pd.read_csv(expected_hours_path, skiprows=skip_rows)
-            required_cols = [
-                "Employee",
-                "Lunes",
-                "Martes",
-                "Miércoles",
-                "Jueves",
-                "Viernes",
-                "Sábado",
-                "Domingo",
-            ]
-            if all(col in df_expected.columns for col in required_cols):
-                df_expected["Employee"] = pd.to_numeric(
-                    df_expected["Employee"], errors="coerce"
-                ).fillna(0).astype(int)
-                for day_col in required_cols[1:]:
-                    if day_col in df_expected.columns:
-                        df_expected[day_col] = pd.to_numeric(
-                            df_expected[day_col], errors="coerce"
-                        ).fillna(0)
-                return df_expected
-            else:
-                print(
-                    "Advertencia: Faltan columnas en 'expected_hours_data.csv'. "
-                    f"Esperadas: {required_cols}."
-                )
-        else:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            cached_signature = (
+                int(cached["mtime_ns"]),
+                int(cached["size"]),
+                str(cached["data_hash"]),
+            )
+            if cached_signature != signature:
+                return None
+            # Cada día se guarda en su propio arreglo para conservar su tipo
+            # (int o float) y que ``get_data_hash`` sea igual al del CSV
+            df_expected = pd.DataFrame(
+                {day: cached[f"day_{i}"] for i, day in enumerate(DAY_COLUMNS)}
+            )
+            df_expected.insert(0, "Employee", cached["employees"])
+            return df_expected
+    except (OSError, KeyError, ValueError):
+        return None
+
+def _save_binary_cache(df_expected, signature):
+    _, _, cache_path = _expected_hours_paths()
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+    try:
+        np.savez(
+            tmp_path,
+            employees=df_expected["Employee"].to_numpy(),
+            **{f"day_{i}": df_expected[day].to_numpy() for i, day in enumerate(DAY_COLUMNS)},
+            mtime_ns=np.int64(signature[0]),
+            size=np.int64(signature[1]),
+            data_hash=np.str_(signature[2]),
+        )
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Advertencia: no se pudo guardar '{BINARY_CACHE_FILE}': {e}")
+
+def _read_expected_hours_csv(expected_hours_path):
+    with open(expected_hours_path, "r", encoding="utf-8") as f:
+        first_line = f.readline().strip()
+        skip_rows = 1 if first_line.startswith("//") else 0
+    df_expected = pd.read_csv(expected_hours_path, skiprows=skip_rows)
+    required_cols = ["Employee"] + DAY_COLUMNS
+    if not all(col in df_expected.columns for col in required_cols):
+        print(
+            "Advertencia: Faltan columnas en 'expected_hours_data.csv'. "
+            f"Esperadas: {required_cols}."
+        )
+        return None
+    df_expected["Employee"] = pd.to_numeric(
+        df_expected["Employee"], errors="coerce"
+    ).fillna(0).astype(int)
+    for day_col in required_cols[1:]:
+        df_expected[day_col] = pd.to_numeric(
+            df_expected[day_col], errors="coerce"
+        ).fillna(0)
+    return df_expected[required_cols]
+
+def load_expected_hours_data(use_cache=True):
+    """
+    Carga el archivo CSV local con las horas esperadas.
+    Con ``use_cache`` usa la copia binaria ``BINARY_CACHE_FILE`` mientras
+    coincidan la fecha de modificación y el tamaño del CSV y el hash de los
+    metadatos; si no, vuelve a leer el CSV y regenera la copia.
+    """
+    try:
+        expected_hours_path = _expected_hours_paths()[0]
+        signature = expected_hours_signature()
+        if signature is None:
             print("Advertencia: No se encontró 'expected_hours_data.csv'.")
+            return None
+        if use_cache:
+            df_expected = _load_binary_cache(signature)
+            if df_expected is not None:
+                return df_expected
+        df_expected = _read_expected_hours_csv(expected_hours_path)
+        if df_expected is not None and use_cache:
+            _save_binary_cache(df_expected, signature)
+        return df_expected
     except Exception as e:
         print(f"Error cargando 'expected_hours_data.csv': {e}")
     return None
 
+class ExpectedHoursStore:
+    """
+    Mantiene en memoria la tabla de horas esperadas y la recarga cuando el CSV
+    cambia. ``get()`` es barato (solo consulta la firma del archivo) y devuelve
+    una tabla que no se modifica, por lo que sirve como instantánea para un
+    reporte en curso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._df = None
+        self._signature = None
+        self._loaded = False
+
+    def get(self):
+        signature = expected_hours_signature()
+        with self._lock:
+            if not self._loaded or signature != self._signature:
+                self._df = load_expected_hours_data()
+                self._signature = signature
+                self._loaded = True
+                clear_expected_hours_index_cache()
+            return self._df
+
+    def refresh(self, incremental=True):
+        """
+        Sincroniza con la API (llamada bloqueante, usar fuera del hilo de la UI)
+        y recarga la tabla si cambió. Los reportes en curso conservan la tabla
+        que obtuvieron con ``get()``. Devuelve True si se completó la
+        sincronización con la API.
+        """
+        previous_update = self.last_update()
+        try:
+            fetch_expected_hours(incremental=incremental)
+        except Exception as e:
+            print(f"Error actualizando horas esperadas: {e}")
+        self.get()
+        return self.last_update() != previous_update
+
+    def last_update(self):
+        """Fecha de la última sincronización con la API, o None."""
+        try:
+            metadata = get_local_metadata()
+        except (OSError, ValueError):
+            return None
+        if not metadata or not metadata.get("last_update"):
+            return None
+        try:
+            return datetime.fromisoformat(metadata["last_update"])
+        except ValueError:
+            return None
+
+class ExpectedHoursIndex:
+    """Tabla densa empleados × días de la semana con los segundos esperados.
+
+    Se construye una sola vez a partir del DataFrame de
+    ``load_expected_hours_data`` y resuelve columnas completas de
+    (ID de empleado, día de la semana) con una búsqueda vectorizada.
+    """
+
+    def __init__(self, expected_hours_df):
+        ids = pd.to_numeric(expected_hours_df["Employee"], errors="coerce")
+        table = pd.DataFrame(
+            {
+                day: pd.to_numeric(expected_hours_df[day], errors="coerce")
+                if day in expected_hours_df.columns
+                else np.nan
+                for day in DAY_COLUMNS
+            },
+            index=expected_hours_df.index,
+        )
+        table["Employee"] = ids
+        # Si un empleado aparece más de una vez se usa su primera fila
+        table = table.dropna(subset=["Employee"]).drop_duplicates("Employee", keep="first")
+        table = table.sort_values("Employee", kind="mergesort")
+
+        self.employee_ids = table["Employee"].to_numpy(dtype="float64")
+        self.seconds = table[DAY_COLUMNS].fillna(0).to_numpy(dtype="float64")
+
+    def rows_for(self, employee_ids):
+        """Fila de la tabla de cada ID de empleado, o -1 si no está.
+
+        Se resuelve una vez por empleado; los grupos toman su fila por código
+        con ``seconds_at``. Los IDs se interpretan como números enteros.
+        """
+        keys = pd.to_numeric(
+            pd.Series(employee_ids).astype(str).str.strip(), errors="coerce"
+        ).to_numpy(dtype="float64")
+        keys = np.trunc(keys)
+        rows = np.full(len(keys), -1, dtype="int64")
+        if not len(self.employee_ids):
+            return rows
+        pos = np.searchsorted(self.employee_ids, keys)
+        pos = np.clip(pos, 0, len(self.employee_ids) - 1)
+        found = np.isfinite(keys) & (self.employee_ids[pos] == keys)
+        rows[found] = pos[found]
+        return rows
+
+    def seconds_at(self, rows, weekdays):
+        """Segundos esperados para filas de ``rows_for`` y días enteros (0 = lunes).
+
+        Las filas -1 devuelven 0.
+        """
+        rows = np.asarray(rows)
+        weekdays = np.asarray(weekdays)
+        result = np.zeros(len(rows), dtype="float64")
+        found = rows >= 0
+        result[found] = self.seconds[rows[found], weekdays[found]]
+        return result
+
+    def lookup(self, employee_ids, weekdays):
+        """Devuelve los segundos esperados para cada par (empleado, día).
+
+        Los IDs se interpretan como números enteros; los IDs inválidos, los
+        empleados desconocidos y los días nulos devuelven 0.
+        """
+        rows = self.rows_for(employee_ids)
+        days = pd.to_numeric(pd.Series(weekdays), errors="coerce").to_numpy(dtype="float64")
+        valid = np.isfinite(days)
+        rows[~valid] = -1
+        return self.seconds_at(rows, np.where(valid, days, 0).astype(int))
+
+
+_index_cache = {"source": None, "index": None}
+_index_cache_lock = threading.Lock()
+
+
+def build_expected_hours_index(expected_hours_df):
+    """Construye el índice de horas esperadas, o None si no hay tabla válida.
+
+    El índice de la última tabla usada se reutiliza mientras se pase el mismo
+    objeto DataFrame; ``clear_expected_hours_index_cache`` lo descarta.
+    """
+    if expected_hours_df is None or "Employee" not in expected_hours_df.columns:
+        return None
+    with _index_cache_lock:
+        source = _index_cache["source"]
+        if source is not None and source() is expected_hours_df:
+            return _index_cache["index"]
+        index = ExpectedHoursIndex(expected_hours_df)
+        _index_cache["source"] = weakref.ref(expected_hours_df)
+        _index_cache["index"] = index
+        return index
+
+
+def clear_expected_hours_index_cache():
+    with _index_cache_lock:
+        _index_cache["source"] = None
+        _index_cache["index"] = None
+
+
 def get_data_hash(dataframe):
     """Genera un hash único para el contenido del DataFrame"""
     # Hacemos una copia para no modificar el DataFrame original
@@ -82,42 +332,90 @@ def get_data_hash(dataframe):
     # Generar el hash con los nombres normalizados
     return hashlib.md5(pd.util.hash_pandas_object(df_copy).values).hexdigest()
 
-def fetch_data_from_api():
-    """Descarga datos desde la API y los transforma en DataFrame usando paginación"""
-    headers = {
-        "xc-token": API_KEY,
-        "Content-Type": "application/json"
-    }
+def _get_session(pool_size):
+    """Sesión HTTP compartida con pool de conexiones y reintentos con backoff exponencial"""
+    global _session, _session_pool_size
+    if _session is None or _session_pool_size < pool_size:
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "xc-token": API_KEY,
+            "Content-Type": "application/json"
+        })
+        _session, _session_pool_size = session, pool_size
+    return _session
+
+def _get_page(session, offset, limit, where, fields=None):
     url = f"{API_URL}/api/v2/tables/{TABLE}/records"
-    
-    all_data = []
-    page_size = 100
-    offset = 0
-    
-    # Bucle para obtener todos los registros usando paginación
-    while True:
-        params = {
-            "offset": offset,
-            "limit": page_size,
-            "where": "",
-            "viewId": PROJECT
-        }
-        
-        resp = requests.get(url, headers=headers, params=params)
-        resp.raise_for_status()
-        page_data = resp.json()["list"]
-        
-        # Añadir datos a la lista acumulativa
-        all_data.extend(page_data)
-        
-        # Si recibimos menos registros que el tamaño de página, hemos terminado
-        if len(page_data) < page_size:
-            break
-              # Actualizar el offset para la siguiente página
-        offset += page_size
+    params = {
+        "offset": offset,
+        "limit": limit,
+        "where": where,
+        "viewId": PROJECT
+    }
+    if fields:
+        params["fields"] = fields
+    resp = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+def _fetch_records(where="", page_size=None, concurrency=None, fields=None):
+    """
+    Descarga todos los registros que cumplen ``where`` usando paginación.
+    Con ``fields`` (nombres separados por coma) solo se piden esos campos.
+    La primera página informa el total de registros (``pageInfo.totalRows``);
+    con ese total se piden las páginas restantes con hasta ``concurrency``
+    solicitudes simultáneas. Si la API no informa el total, se pagina en serie.
+    """
+    page_size = page_size or PAGE_SIZE
+    concurrency = max(1, concurrency or PAGES_IN_FLIGHT)
+    session = _get_session(concurrency)
+
+    first = _get_page(session, 0, page_size, where, fields)
+    all_data = list(first["list"])
+    page_info = first.get("pageInfo") or {}
+    total_rows = page_info.get("totalRows")
+
+    if total_rows is None:
+        # Sin total: seguir pidiendo hasta recibir una página incompleta
+        offset = len(all_data)
+        page_data = all_data
+        while len(page_data) == page_size:
+            page_data = _get_page(session, offset, page_size, where, fields)["list"]
+            all_data.extend(page_data)
+            offset += page_size
+    elif len(all_data) < int(total_rows) and all_data:
+        # La API puede limitar el tamaño de página; usar el tamaño que realmente devolvió
+        effective_size = len(all_data)
+        offsets = range(effective_size, int(total_rows), effective_size)
+        if concurrency == 1:
+            pages = [_get_page(session, offset, effective_size, where, fields) for offset in offsets]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                pages = list(pool.map(lambda offset: _get_page(session, offset, effective_size, where, fields), offsets))
+        for page in pages:
+            all_data.extend(page["list"])
     
     print(f"Total de registros descargados: {len(all_data)}")
-    
+    return all_data
+
+def _fetch_employee_ids():
+    """IDs (enteros) de todos los empleados de la API, descargando solo el campo ``Employee``"""
+    records = _fetch_records(fields="Employee")
+    ids = pd.to_numeric(pd.Series([r.get("Employee") for r in records], dtype=object), errors="coerce")
+    return set(ids.dropna().astype("int64"))
+
+def _records_to_dataframe(all_data):
+    """Transforma los registros de la API en DataFrame con columnas de días cortas"""
     # Convertir en DataFrame
     df = pd.DataFrame(all_data)
     
@@ -202,6 +500,46 @@ def fetch_data_from_api():
         print("No se pudo convertir la columna Employee a entero")
     return df
 
+def fetch_data_from_api():
+    """Descarga datos desde la API y los transforma en DataFrame usando paginación"""
+    return _records_to_dataframe(_fetch_records())
+
+def _to_full_day_names(df):
+    return df.rename(columns={col: SHORT_TO_FULL_DAY[col] for col in df.columns if col in SHORT_TO_FULL_DAY})
+
+def get_row_hashes(dataframe):
+    """Hash por empleado de sus horas esperadas, para detectar filas modificadas"""
+    df_full = _to_full_day_names(dataframe)
+    day_cols = [col for col in DAY_COLUMNS if col in df_full.columns]
+    values = df_full[day_cols].apply(pd.to_numeric, errors="coerce").astype("float64")
+    hashes = pd.util.hash_pandas_object(values, index=False)
+    employees = pd.to_numeric(df_full["Employee"], errors="coerce")
+    return {
+        str(int(emp)): str(row_hash)
+        for emp, row_hash in zip(employees, hashes)
+        if pd.notnull(emp)
+    }
+
+def _save_metadata(df, full_sync, previous_metadata=None):
+    now = datetime.now().isoformat()
+    last_full_sync = now if full_sync else (previous_metadata or {}).get("last_full_sync")
+    metadata = {
+        "last_update": now,
+        "data_hash": get_data_hash(df),
+        "last_full_sync": last_full_sync,
+        "row_hashes": get_row_hashes(df),
+    }
+    tmp_path = f"{LOCAL_METADATA_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f)
+    os.replace(tmp_path, LOCAL_METADATA_PATH)
+
+def _write_local_csv(df):
+    """Escribe el CSV local de forma atómica para no exponer archivos a medio escribir."""
+    tmp_path = f"{LOCAL_DATA_PATH}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, LOCAL_DATA_PATH)
+
 def save_data_locally(df):
     """Guarda el DataFrame en un archivo local con metadatos"""
     # Crear una copia del DataFrame para no modificar el original
@@ -223,24 +561,18 @@ def save_data_locally(df):
     df_to_save = df_to_save.rename(columns=rename_cols)
     
     # Guardar el DataFrame con nombres de columnas completos
-    df_to_save.to_csv(LOCAL_DATA_FILE, index=False)
+    _write_local_csv(df_to_save)
     print(f"Columnas guardadas en el archivo: {df_to_save.columns.tolist()}")
     
-    # Guardar metadatos (fecha de actualización y hash)
-    metadata = {
-        "last_update": datetime.now().isoformat(),
-        "data_hash": get_data_hash(df)
-    }
-    
-    with open(LOCAL_METADATA_FILE, 'w') as f:
-        json.dump(metadata, f)
+    # Guardar metadatos (fecha de actualización, hash global y hash por fila)
+    _save_metadata(df, full_sync=True)
     
     print(f"Datos guardados localmente en {LOCAL_DATA_FILE}")
 
 def load_local_data():
     """Carga datos desde el archivo local si existe"""
-    if os.path.exists(LOCAL_DATA_FILE):
-        df = pd.read_csv(LOCAL_DATA_FILE)
+    if os.path.exists(LOCAL_DATA_PATH):
+        df = pd.read_csv(LOCAL_DATA_PATH)
         # El archivo CSV usa nombres completos, pero internamente utilizamos abreviaturas
         # Para mantener consistencia, los convertimos de nuevo a formato corto
         day_names_map = {
@@ -260,14 +592,81 @@ def load_local_data():
 
 def get_local_metadata():
     """Obtiene los metadatos del archivo local si existe"""
-    if os.path.exists(LOCAL_METADATA_FILE):
-        with open(LOCAL_METADATA_FILE, 'r') as f:
+    if os.path.exists(LOCAL_METADATA_PATH):
+        with open(LOCAL_METADATA_PATH, 'r') as f:
             return json.load(f)
     return None
 
-def fetch_expected_hours():
+def sync_expected_hours_incremental(local_data, local_metadata):
+    """
+    Descarga solo los registros modificados desde 'last_update' y los aplica
+    sobre el archivo local, reemplazando únicamente a los empleados cuyo hash
+    de fila cambió. Devuelve el DataFrame actualizado, o None si hace falta
+    una sincronización completa (sin hashes por fila, última descarga completa
+    muy antigua o la API tiene empleados que no están en el archivo local).
+    Los empleados que ya no están en la API se eliminan del archivo local;
+    para detectarlos se descargan los IDs de todos los registros.
+    """
+    row_hashes = local_metadata.get("row_hashes")
+    last_update = local_metadata.get("last_update")
+    last_full_sync = local_metadata.get("last_full_sync")
+    if not row_hashes or not last_update or not last_full_sync:
+        return None
+    if datetime.now() - datetime.fromisoformat(last_full_sync) > timedelta(days=FULL_RESYNC_DAYS):
+        return None
+
+    # Se retrocede un día para cubrir diferencias de zona horaria con la API;
+    # las filas sin cambios se descartan por su hash
+    since = (datetime.fromisoformat(last_update) - timedelta(days=1)).strftime("%Y-%m-%d")
+    records = _fetch_records(where=f"({UPDATED_FIELD},ge,exactDate,{since})")
+
+    cols = ["Employee"] + DAY_COLUMNS
+    patched = _to_full_day_names(local_data)
+    changed_count = 0
+    if records:
+        changed = _to_full_day_names(_records_to_dataframe(records))
+        if not set(cols).issubset(changed.columns) or not set(cols).issubset(patched.columns):
+            return None
+        changed = changed[cols].drop_duplicates("Employee", keep="last")
+        new_hashes = get_row_hashes(changed)
+        keys = changed["Employee"].astype(int).astype(str)
+        changed = changed[[new_hashes.get(k) != row_hashes.get(k) for k in keys]]
+        changed_count = len(changed)
+        if changed_count:
+            patched = patched.set_index("Employee")
+            updates = changed.set_index("Employee")
+            existing = updates.index.isin(patched.index)
+            patched.loc[updates.index[existing], DAY_COLUMNS] = updates.loc[existing, DAY_COLUMNS]
+            patched = pd.concat([patched, updates[~existing]]).reset_index()
+
+    # Un conteo no basta: un alta y una baja en el mismo periodo se compensan
+    api_ids = _fetch_employee_ids()
+    local_ids = pd.to_numeric(patched["Employee"], errors="coerce")
+    missing = api_ids.difference(local_ids.dropna().astype("int64"))
+    if missing:
+        print(f"La API tiene {len(missing)} empleados que no están en el archivo local.")
+        return None
+    deleted = local_ids.notna() & ~local_ids.isin(list(api_ids))
+    deleted_count = int(deleted.sum())
+    if deleted_count:
+        patched = patched[~deleted].reset_index(drop=True)
+
+    if changed_count or deleted_count:
+        _write_local_csv(patched)
+        print(
+            f"Se actualizaron {changed_count} y se eliminaron {deleted_count} empleados en {LOCAL_DATA_FILE}"
+        )
+    else:
+        print("No hay cambios desde la última actualización.")
+    _save_metadata(patched, full_sync=False, previous_metadata=local_metadata)
+    return patched
+
+def fetch_expected_hours(incremental=True):
     """
     Descarga registros de la tabla o usa la versión local si está disponible y actualizada.
+    Con ``incremental`` primero intenta descargar solo los registros modificados
+    (ver ``sync_expected_hours_incremental``) y recurre a la descarga completa
+    si no es posible.
     Devuelve un DataFrame con la columna 'Employee' y las columnas de días disponibles
     donde cada columna contiene los segundos esperados para ese día.
     """
@@ -281,6 +680,17 @@ def fetch_expected_hours():
         save_data_locally(df)
         return df
     
+    if incremental:
+        try:
+            print("Buscando registros modificados...")
+            patched = sync_expected_hours_incremental(local_data, local_metadata)
+            if patched is not None:
+                return patched
+            print("Se requiere una sincronización completa.")
+        except Exception as e:
+            print(f"Error en la sincronización incremental: {str(e)}")
+            print("Se intentará una sincronización completa...")
+    
     try:
         # Comprobar si hay cambios comparando con la API
         print("Verificando si hay actualizaciones...")
@@ -293,6 +703,8 @@ def fetch_expected_hours():
             return api_data
         else:
             print(f"Usando datos locales (última actualización: {local_metadata.get('last_update')})")
+            # Registrar los hashes por fila para habilitar la sincronización incremental
+            _save_metadata(api_data, full_sync=True)
             return local_data
     except Exception as e:
         print(f"Error al comprobar actualizaciones: {str(e)}")
@@ -0,0 +1,111 @@
+"""Lectura de exportaciones de checadas.
+
+``read_xlsx_punches`` recorre la hoja en modo de solo lectura y conserva
+únicamente las columnas pedidas, descartando las filas fuera del rango de
+fechas antes de construir el DataFrame. Las celdas se convierten igual que en
+``pd.read_excel`` para que los tipos resultantes sean los mismos.
+``read_csv_punches`` y ``read_parquet_punches`` hacen lo mismo para
+exportaciones en CSV y Parquet (este último requiere pyarrow).
+"""
+
+import datetime
+
+import pandas as pd
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+
+
+def _convert_value(value):
+    """Mismo criterio que el lector openpyxl de pandas para cada celda."""
+    if value is None:
+        return ""
+    if type(value) is float and value.is_integer():
+        return int(value)
+    return value
+
+
+def _as_datetime(value):
+    if type(value) is datetime.date:
+        return datetime.datetime.combine(value, datetime.time())
+    return value
+
+
+def read_xlsx_punches(src, columns, time_column="Time", date_range=None):
+    """Lee la primera hoja de ``src`` y devuelve solo ``columns``.
+
+    ``date_range`` es ``(desde, hasta)`` como ``datetime.datetime``
+    (cualquiera puede ser None): se descartan las filas cuya ``time_column``
+    es una fecha fuera de ``[desde, hasta)``. Las filas con fechas en texto
+    se conservan para que las filtre quien llame, después de convertirlas.
+    Las columnas de ``columns`` que no existan en la hoja se omiten.
+    """
+    book = load_workbook(src, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = book.worksheets[0]
+        sheet.reset_dimensions()
+        header_row = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        header = [_convert_value(value) for value in header_row]
+        positions = {}
+        for position, name in enumerate(header):
+            if name in columns and name not in positions:
+                positions[name] = position
+        selected = [name for name in columns if name in positions]
+        indexes = [positions[name] for name in selected]
+        width = max(indexes) + 1 if indexes else 0
+
+        start, end = date_range or (None, None)
+        time_position = positions.get(time_column)
+        filter_rows = time_position is not None and (start is not None or end is not None)
+
+        data = [selected]
+        rows = sheet.iter_rows(min_row=2, max_col=width, values_only=True) if width else ()
+        for row in rows:
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            if filter_rows:
+                value = _as_datetime(row[time_position])
+                if isinstance(value, datetime.datetime):
+                    if (start is not None and value < start) or (end is not None and value >= end):
+                        continue
+            data.append([_convert_value(row[index]) for index in indexes])
+    finally:
+        book.close()
+
+    # Igual que pandas: se descartan las filas vacías al final de la hoja
+    while len(data) > 1 and all(value == "" for value in data[-1]):
+        data.pop()
+    if len(data) == 1:
+        return pd.DataFrame(columns=selected)
+    return TextParser(data, header=0, skip_blank_lines=False).read()
+
+
+def _filter_time_window(df, time_column, date_range):
+    start, end = date_range or (None, None)
+    if time_column not in df.columns or (start is None and end is None):
+        return df
+    times = pd.to_datetime(df[time_column], errors="coerce")
+    # Igual que en xlsx: las fechas que no se pueden interpretar se conservan
+    keep = times.isna()
+    inside = pd.Series(True, index=df.index)
+    if start is not None:
+        inside &= times >= start
+    if end is not None:
+        inside &= times < end
+    return df[keep | inside].reset_index(drop=True)
+
+
+def read_csv_punches(src, columns, time_column="Time", date_range=None):
+    """Lee un CSV conservando solo ``columns`` y las filas dentro de ``date_range``."""
+    df = pd.read_csv(src, usecols=lambda name: name in columns)
+    return _filter_time_window(df, time_column, date_range)
+
+
+def read_parquet_punches(src, columns, time_column="Time", date_range=None):
+    """Lee un Parquet cargando solo ``columns`` y las filas dentro de ``date_range``."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Se requiere pyarrow para leer archivos Parquet.") from None
+    available = set(pq.read_schema(src).names)
+    df = pd.read_parquet(src, columns=[name for name in columns if name in available])
+    return _filter_time_window(df, time_column, date_range)
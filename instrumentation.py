@@ -0,0 +1,134 @@
+"""Medición por etapas del pipeline del reporte.
+
+``generate_report`` y ``format_excel`` aceptan un objeto ``Instrumentation``
+y marcan cada etapa con ``begin(nombre)`` / ``end(filas)``. Cada marca se
+convierte en un evento que se entrega a los *sinks* configurados. Sin
+instrumentación se usa ``NO_INSTRUMENTATION``, cuyos métodos no hacen nada.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+
+def current_rss():
+    """Memoria residente del proceso en bytes, o None si no se puede medir."""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _Counters(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = _Counters()
+            counters.cb = ctypes.sizeof(_Counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+        except Exception:
+            pass
+    return None
+
+
+class NullInstrumentation:
+    """Instrumentación desactivada: todas las marcas son no-ops."""
+
+    enabled = False
+
+    def begin(self, stage):
+        pass
+
+    def end(self, rows=None):
+        pass
+
+
+NO_INSTRUMENTATION = NullInstrumentation()
+
+
+class Instrumentation:
+    """Registra inicio y fin de cada etapa y los envía a los sinks.
+
+    Cada sink es un callable que recibe un dict. Los eventos de fin incluyen
+    ``seconds``, ``rows`` (si la etapa lo informa) y ``rss_delta_bytes``.
+    ``begin`` cierra automáticamente la etapa anterior si sigue abierta.
+    """
+
+    enabled = True
+
+    def __init__(self, *sinks, track_rss=True):
+        self.sinks = list(sinks)
+        self.track_rss = track_rss
+        self.events = []
+        self._stage = None
+        self._started = None
+        self._rss_start = None
+
+    def _emit(self, event):
+        self.events.append(event)
+        for sink in self.sinks:
+            sink(event)
+
+    def begin(self, stage):
+        if self._stage is not None:
+            self.end()
+        self._stage = stage
+        self._rss_start = current_rss() if self.track_rss else None
+        self._started = time.perf_counter()
+        self._emit({"event": "start", "stage": stage})
+
+    def end(self, rows=None):
+        if self._stage is None:
+            return
+        elapsed = time.perf_counter() - self._started
+        event = {"event": "end", "stage": self._stage, "seconds": round(elapsed, 6), "rows": rows}
+        if self._rss_start is not None:
+            rss_end = current_rss()
+            event["rss_delta_bytes"] = rss_end - self._rss_start if rss_end is not None else None
+        self._stage = None
+        self._emit(event)
+
+    def timings(self):
+        """Lista de ``(etapa, segundos, filas)`` de las etapas terminadas."""
+        return [
+            (event["stage"], event["seconds"], event["rows"])
+            for event in self.events
+            if event["event"] == "end"
+        ]
+
+
+class JsonLinesSink:
+    """Sink que agrega cada evento como una línea JSON al archivo ``path``."""
+
+    def __init__(self, path, **context):
+        self.path = path
+        self.context = context
+
+    def __call__(self, event):
+        record = {"time": datetime.now().isoformat(), **self.context, **event}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
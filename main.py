@@ -3,12 +3,19 @@ from tkinter import Tk
 from ui import CheckadorApp
 
 
-def main() -> None:
+def create_app():
+    """Crea la ventana principal y la muestra sin esperar a los módulos pesados."""
     root = Tk()
     app = CheckadorApp(root)
+    root.update()
+    return root, app
+
+
+def main() -> None:
+    root, app = create_app()
+    app.start_warm_up()
     root.mainloop()
 
 
 if __name__ == "__main__":  # pragma: no cover - entry point
     main()
-
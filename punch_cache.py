@@ -0,0 +1,95 @@
+"""Caché local de exportaciones de checadas ya leídas.
+
+Guarda la tabla de checadas normalizada en formato binario de pandas, con
+una clave formada por el hash del contenido del archivo de entrada y la
+versión del lector. Así, volver a generar el reporte del mismo archivo evita
+``pd.read_excel``, que es el paso más lento.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+
+# Incrementar cuando cambie la forma en que se normaliza la tabla leída
+PARSER_VERSION = "1"
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "checadas")
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+CACHE_EXTENSION = ".pkl"
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """Hash SHA-256 del contenido del archivo."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(path, variant=None):
+    """Clave de caché; ``variant`` distingue lecturas parciales del mismo archivo."""
+    key = f"{file_hash(path)}-v{PARSER_VERSION}"
+    return f"{key}-{variant}" if variant else key
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key + CACHE_EXTENSION)
+
+
+def load(key, cache_dir=CACHE_DIR):
+    """Devuelve la tabla guardada para ``key`` o None si no existe."""
+    path = _entry_path(key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_pickle(path)
+    except Exception as e:
+        print(f"Advertencia: entrada de caché inválida '{path}': {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    # Marca la entrada como usada recientemente para el desalojo
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return df
+
+
+def store(key, df, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Guarda la tabla y desaloja las entradas más antiguas si se excede el tamaño."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Elimina las entradas usadas hace más tiempo hasta quedar bajo ``max_bytes``."""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(CACHE_EXTENSION):
+            path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Otro proceso la desalojó mientras se recorría la carpeta
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,222 @@
+"""Almacén local de checadas para reprocesar solo las jornadas que cambiaron.
+
+Las exportaciones de cada mes se traslapan por semanas con la anterior.
+``PunchStore`` guarda en SQLite las checadas normalizadas, sin duplicados, y
+los grupos ya calculados de cada (empleado, jornada). Al agregar una
+exportación, las checadas que ya estaban se cuentan como duplicadas. Solo se
+recalculan las jornadas que recibieron checadas nuevas, y el reporte se arma
+con los grupos guardados.
+
+Los empleados se identifican por su nombre, igual que en el reporte. Las
+jornadas se guardan como texto "AAAA-MM-DD" y las checadas como enteros
+(ns desde epoch). Las horas esperadas no se guardan: se consultan en cada
+reporte.
+"""
+
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Incrementar cuando cambie el cálculo de los grupos guardados
+ENGINE_VERSION = "1"
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checadas.sqlite")
+
+# Los valores de pandas pueden llegar como escalares de numpy
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS punches (
+    employee NOT NULL,
+    time INTEGER NOT NULL,
+    shift NOT NULL,
+    workday TEXT NOT NULL,
+    PRIMARY KEY (employee, time, shift)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS punches_by_workday ON punches (employee, workday);
+CREATE TABLE IF NOT EXISTS workdays (
+    employee NOT NULL,
+    workday TEXT NOT NULL,
+    shift NOT NULL,
+    worked INTEGER NOT NULL,
+    times BLOB NOT NULL,
+    PRIMARY KEY (employee, workday, shift)
+) WITHOUT ROWID;
+"""
+
+# Tabla temporal con las (empleado, jornada) de la exportación actual
+DAYS_TABLE = """
+CREATE TEMP TABLE IF NOT EXISTS report_days (
+    employee NOT NULL,
+    workday TEXT NOT NULL,
+    PRIMARY KEY (employee, workday)
+) WITHOUT ROWID
+"""
+
+
+class PunchStore:
+    """Conexión al almacén de checadas en ``path``.
+
+    Se usa como context manager o se cierra con ``close()``. Cada método
+    que modifica el almacén se ejecuta en su propia transacción.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, timeout=60.0):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_meta(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def ensure_settings(self, settings, assign):
+        """Invalida los grupos guardados si cambió la forma de calcularlos.
+
+        ``settings`` identifica el cálculo (versión y horas de corte). Si es
+        distinto del guardado, se vuelve a asignar la jornada de todas las
+        checadas con ``assign(times, shifts)`` (que recibe una Series de
+        fechas y otra de turnos y devuelve fechas) y se borran los grupos.
+        Devuelve True si hubo que invalidar.
+        """
+        settings = f"{ENGINE_VERSION}|{settings}"
+        current = self._get_meta("settings")
+        if current == settings:
+            return False
+        with self.connection:
+            if current is not None:
+                punches = pd.read_sql_query("SELECT employee, time, shift FROM punches", self.connection)
+                if not punches.empty:
+                    times = pd.Series(punches["time"].to_numpy(dtype="int64").view("datetime64[ns]"))
+                    workdays = assign(times, punches["shift"])
+                    punches["workday"] = [day.isoformat() for day in workdays]
+                    self.connection.execute("DELETE FROM punches")
+                    self.connection.executemany(
+                        "INSERT INTO punches (employee, time, shift, workday) VALUES (?, ?, ?, ?)",
+                        punches[["employee", "time", "shift", "workday"]].itertuples(index=False, name=None),
+                    )
+            self.connection.execute("DELETE FROM workdays")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('settings', ?)", (settings,)
+            )
+        return current is not None
+
+    def add_punches(self, punches):
+        """Agrega las checadas de una exportación y marca sus jornadas.
+
+        ``punches`` tiene las columnas ``employee``, ``time`` (int64),
+        ``shift`` y ``workday`` ("AAAA-MM-DD"). Las checadas que ya estaban
+        en el almacén (mismo empleado, hora y turno) no se agregan. Los
+        grupos guardados de las jornadas que reciben checadas nuevas se
+        borran para recalcularlas. Las (empleado, jornada) de ``punches``
+        quedan como jornadas del reporte actual (ver ``stale_days`` y
+        ``load_days``).
+
+        Devuelve ``(agregadas, duplicadas)``.
+        """
+        columns = ["employee", "time", "shift", "workday"]
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS temp.incoming")
+            self.connection.execute(
+                "CREATE TEMP TABLE incoming (employee, time INTEGER, shift, workday TEXT)"
+            )
+            self.connection.executemany(
+                "INSERT INTO incoming VALUES (?, ?, ?, ?)",
+                punches[columns].itertuples(index=False, name=None),
+            )
+            self.connection.execute(DAYS_TABLE)
+            self.connection.execute("DELETE FROM report_days")
+            self.connection.execute(
+                "INSERT INTO report_days SELECT DISTINCT employee, workday FROM incoming"
+            )
+            self.connection.execute(
+                """
+                DELETE FROM workdays WHERE (employee, workday) IN (
+                    SELECT i.employee, i.workday FROM incoming i
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM punches p
+                        WHERE p.employee = i.employee AND p.time = i.time AND p.shift = i.shift
+                    )
+                )
+                """
+            )
+            before = self.connection.total_changes
+            self.connection.execute(
+                "INSERT OR IGNORE INTO punches (employee, time, shift, workday) "
+                "SELECT employee, time, shift, workday FROM incoming"
+            )
+            added = self.connection.total_changes - before
+            self.connection.execute("DROP TABLE temp.incoming")
+        return added, len(punches) - added
+
+    def stale_days(self):
+        """Checadas guardadas de las jornadas del reporte que no tienen grupos.
+
+        Devuelve un DataFrame con ``employee``, ``time``, ``shift`` y
+        ``workday`` con todas las checadas (de esta y de exportaciones
+        anteriores) de esas jornadas.
+        """
+        return pd.read_sql_query(
+            """
+            SELECT p.employee, p.time, p.shift, p.workday
+            FROM report_days d
+            JOIN punches p ON p.employee = d.employee AND p.workday = d.workday
+            WHERE NOT EXISTS (
+                SELECT 1 FROM workdays w WHERE w.employee = d.employee AND w.workday = d.workday
+            )
+            """,
+            self.connection,
+        )
+
+    def save_days(self, groups, times, offsets):
+        """Guarda los grupos calculados.
+
+        ``groups`` tiene ``employee``, ``workday``, ``shift`` y ``worked``
+        (ns) por grupo, en el orden de ``offsets``. Las checadas del grupo
+        ``i`` son ``times[offsets[i]:offsets[i + 1]]``.
+        """
+        times = np.ascontiguousarray(times, dtype="int64")
+        rows = (
+            (employee, workday, shift, int(worked), times[offsets[i]:offsets[i + 1]].tobytes())
+            for i, (employee, workday, shift, worked) in enumerate(
+                groups[["employee", "workday", "shift", "worked"]].itertuples(index=False, name=None)
+            )
+        )
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO workdays (employee, workday, shift, worked, times) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def load_days(self):
+        """Grupos guardados de las jornadas del reporte.
+
+        Devuelve un DataFrame con ``employee``, ``workday``, ``shift``,
+        ``worked`` y ``times`` (bytes con las checadas int64 del grupo), sin
+        un orden particular.
+        """
+        return pd.read_sql_query(
+            """
+            SELECT w.employee, w.workday, w.shift, w.worked, w.times
+            FROM report_days d
+            JOIN workdays w ON w.employee = d.employee AND w.workday = d.workday
+            """,
+            self.connection,
+        )
@@ -1,209 +1,1078 @@
+import contextlib
 import datetime
+import functools
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill, Border, Side
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import Font, NamedStyle, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
-from tkinter import messagebox
 
+import punch_cache
+import result_cache
+from punch_store import PunchStore
+from expected_hours import build_expected_hours_index
+from ingest import read_csv_punches, read_parquet_punches, read_xlsx_punches
+from instrumentation import NO_INSTRUMENTATION
+
+HEADER_FILL = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
+HEADER_FONT = Font(color="FFFFFF", bold=True)
+TOTAL_FILL = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+BOLD_FONT = Font(bold=True)
+THIN_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin"),
+)
+NEGATIVE_DIFF_FILL = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
+POSITIVE_DIFF_FILL = PatternFill(start_color="1CC0EE", end_color="1CC0EE", fill_type="solid")
+
+MIN_COLUMN_WIDTHS = {
+    "ID Empleado": 12,
+    "Nombre del empleado": 30,
+    "Nombre": 30,
+    "Turno": 10,
+    "Fecha": 12,
+    "Día": 12,
+    "Horas esperadas": 20,
+    "Horas totales": 15,
+    "Horas trabajadas": 15,
+    "Horas Trabajadas (Segundos)": 22,
+    "Total Segundos Esperados": 22,
+    "Diferencia (Segundos)": 22,
+    "Diferencia (HH:MM:SS)": 22,
+    "Días del periodo": 18,
+    "Días trabajados": 18,
+}
+
+WRITE_CHUNK_ROWS = 10000
+
+# Estilos del libro: "cells" aplica el estilo a cada celda de totales y de
+# diferencia; "conditional" usa un estilo con nombre para el encabezado y
+# reglas de formato condicional por hoja, sin estilos por fila
+EXCEL_STYLE_MODES = ("cells", "conditional")
+HEADER_STYLE_NAME = "Encabezado reporte"
+
+# Formatos de salida: "xlsx" escribe el libro con estilos; los demás escriben
+# "Detalle" y "Resumen" como archivos separados sin pasar por openpyxl
+OUTPUT_FORMATS = {"xlsx": ".xlsx", "csv": ".csv", "parquet": ".parquet", "jsonl": ".jsonl"}
+
+# Las checadas anteriores a esta hora pertenecen a la jornada del día anterior
+DEFAULT_WORKDAY_CUTOFF = datetime.time(6, 0)
+
+# Incrementar cuando cambie el contenido o el formato del reporte generado
+REPORT_VERSION = "4"
+
+# Etapas que generate_report notifica, en orden de ejecución
+REPORT_STAGES = ("read", "group", "expected_hours", "summary", "format", "write")
+
+
+class ReportCancelled(Exception):
+    """Se lanza desde el callback de progreso para detener la generación."""
+
+
+class OutputInUseError(Exception):
+    """Otro proceso ya está generando un reporte en el mismo archivo."""
+
+
+def _no_progress(stage):
+    pass
+
+
+def _lock_exclusive(lock_file):
+    """Bloqueo exclusivo sin espera; lanza OSError si otro proceso lo tiene."""
+    if os.name == "nt":
+        import msvcrt
+
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
 
-def _get_expected_seconds_for_day(row_data, expected_hours_df, cache):
-    if expected_hours_df is None:
-        return 0.0
-    try:
-        if row_data.get("Turno") == "Totales":
-            return 0.0
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
 
-        if not pd.notnull(row_data.get("Fecha")):
-            return 0.0
 
-        dia_semana_str = row_data.get("Día", "")
-        if not dia_semana_str or dia_semana_str not in expected_hours_df.columns:
-            return 0.0
+@contextlib.contextmanager
+def output_lock(dst):
+    """Bloqueo exclusivo sobre ``dst`` mientras se genera el reporte.
 
-        emp_id_str = str(row_data.get("ID Empleado", "")).strip()
-        if not emp_id_str:
-            return 0.0
+    Usa un bloqueo del sistema operativo sobre ``<dst>.lock``, que se libera
+    solo aunque el proceso termine de forma inesperada. Solo quien obtuvo el
+    bloqueo borra el archivo al terminar.
+    """
+    lock_path = f"{dst}.lock"
+    while True:
+        lock_file = open(lock_path, "a+")
+        try:
+            _lock_exclusive(lock_file)
+        except OSError:
+            lock_file.close()
+            raise OutputInUseError(
+                f"Ya se está generando un reporte en '{os.path.basename(dst)}'."
+            ) from None
+        # Si quien tenía el bloqueo borró el archivo después de que lo
+        # abrimos, el bloqueo quedó sobre un archivo huérfano: se reintenta
+        try:
+            current = os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_path))
+        except OSError:
+            current = False
+        if current:
+            break
+        lock_file.close()
+    try:
+        yield
+    finally:
+        # Se borra mientras el bloqueo sigue activo; en Windows no se puede
+        # borrar un archivo abierto, así que allá se borra después de cerrarlo
+        if os.name != "nt":
+            _remove_quietly(lock_path)
+        lock_file.close()
+        if os.name == "nt":
+            _remove_quietly(lock_path)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
-        cache_key = f"{emp_id_str}_{dia_semana_str}"
-        if cache_key in cache:
-            return float(cache[cache_key])
 
+def _cutoff_to_ns(cutoff):
+    """Convierte una hora de corte (``datetime.time``, "HH:MM[:SS]" u horas) a ns desde medianoche."""
+    if isinstance(cutoff, datetime.time):
+        seconds = cutoff.hour * 3600 + cutoff.minute * 60 + cutoff.second
+    elif isinstance(cutoff, str):
         try:
-            employee_id_num = int(float(emp_id_str))
+            parts = [int(part) for part in cutoff.strip().split(":")]
         except ValueError:
-            return 0.0
-
-        emp_mask = expected_hours_df["Employee"] == employee_id_num
-        if not emp_mask.any():
-            cache[cache_key] = 0.0
-            return 0.0
+            raise ValueError(f"Hora de corte inválida: '{cutoff}'") from None
+        if not 1 <= len(parts) <= 3:
+            raise ValueError(f"Hora de corte inválida: '{cutoff}'")
+        parts += [0] * (3 - len(parts))
+        seconds = parts[0] * 3600 + parts[1] * 60 + parts[2]
+    else:
+        seconds = float(cutoff) * 3600
+    if not 0 <= seconds < 24 * 3600:
+        raise ValueError(f"Hora de corte fuera de rango: '{cutoff}'")
+    return int(round(seconds * 1e9))
+
+
+def assign_workday(times, shifts=None, cutoff=DEFAULT_WORKDAY_CUTOFF, shift_cutoffs=None):
+    """Fecha de la jornada a la que pertenece cada checada.
+
+    Las checadas anteriores a la hora de corte se asignan al día anterior,
+    para que un turno nocturno (22:00-06:00) quede en una sola jornada.
+    ``cutoff`` es la hora de corte general y ``shift_cutoffs`` un dict
+    opcional ``{turno: hora de corte}`` que la reemplaza para esos turnos.
+    Las horas pueden ser ``datetime.time``, "HH:MM" o un número de horas.
+    Con los valores por defecto equivale a ``hora < 6``.
+    """
+    day_start = times.dt.normalize()
+    time_of_day = (times - day_start).to_numpy(dtype="timedelta64[ns]").view("int64")
+    cutoff_ns = _cutoff_to_ns(cutoff)
+    if shift_cutoffs and shifts is not None:
+        per_shift = {shift: _cutoff_to_ns(value) for shift, value in shift_cutoffs.items()}
+        row_cutoff = shifts.map(per_shift).fillna(cutoff_ns).to_numpy(dtype="int64")
+    else:
+        row_cutoff = cutoff_ns
+    rollover = time_of_day < row_cutoff
+    workday = day_start - pd.to_timedelta(rollover.astype("int64"), unit="D")
+    return workday.dt.date
+
+
+def merge_no_shift(df_turno, df_sin_turno, employee_key="Employee Name"):
+    """Asigna las checadas sin turno a los grupos con turno.
+
+    Cada checada sin turno se une por (empleado, día laboral) al primer grupo
+    con turno de ese día, sin repetir horas ya registradas en el grupo. Las que
+    no tienen grupo conservan ``Shift`` vacío y forman grupos propios.
+    Devuelve una checada por fila con las columnas de agrupación y ``Time``.
+    ``employee_key`` es la columna que identifica al empleado.
+    """
+    day_keys = [employee_key, "WorkDay"]
+    shift_keys = [employee_key, "Shift", "WorkDay"]
+
+    targets = (
+        df_turno[shift_keys]
+        .dropna(subset=day_keys)
+        .sort_values(shift_keys, kind="mergesort")
+        .drop_duplicates(day_keys, keep="first")
+        .rename(columns={"Shift": "Target Shift"})
+    )
+    ns_df = df_sin_turno[day_keys + ["Time"]].merge(targets, on=day_keys, how="left")
+    matched = ns_df["Target Shift"].notna()
 
-        value_seconds = expected_hours_df.loc[emp_mask, dia_semana_str].iloc[0]
-        result_seconds = float(value_seconds) if pd.notnull(value_seconds) else 0.0
+    attached = (
+        ns_df[matched]
+        .rename(columns={"Target Shift": "Shift"})[shift_keys + ["Time"]]
+        .drop_duplicates()
+    )
+    existing = df_turno[shift_keys + ["Time"]].drop_duplicates()
+    attached = attached.merge(existing, on=shift_keys + ["Time"], how="left", indicator=True)
+    attached = attached[attached["_merge"] == "left_only"].drop(columns="_merge")
+
+    extra_df = ns_df.loc[~matched, day_keys + ["Time"]].assign(Shift="")
+    return pd.concat(
+        [df_turno[shift_keys + ["Time"]], attached, extra_df[shift_keys + ["Time"]]],
+        ignore_index=True,
+    )
 
-        cache[cache_key] = result_seconds
-        return result_seconds
-    except Exception:
-        return 0.0
 
+def build_punch_groups(punches, employee_key="Employee Name"):
+    """Ordena las checadas y las agrupa en formato CSR.
 
-def generate_report(src, dst, expected_hours_df=None, expected_hours_cache=None):
-    if expected_hours_cache is None:
-        expected_hours_cache = {}
+    Devuelve ``(groups, times, offsets)``: ``groups`` tiene una fila por
+    (empleado, día laboral, turno) en orden de reporte, ``times`` son las
+    checadas como int64 (ns desde epoch) ordenadas dentro de cada grupo y las
+    checadas del grupo ``i`` son ``times[offsets[i]:offsets[i + 1]]``.
+    """
+    keys = [employee_key, "WorkDay", "Shift"]
+    punches = punches.dropna(subset=keys)
+    ordered = punches[keys].assign(
+        _t=punches["Time"].to_numpy(dtype="datetime64[ns]").view("int64")
+    )
+    ordered = ordered.sort_values(keys + ["_t"], kind="mergesort")
 
-    df_excel = pd.read_excel(src)
-    if {"Employee Name", "Time"}.difference(df_excel.columns):
-        raise ValueError(
-            "Las columnas requeridas 'Employee Name' y 'Time' no se encontraron."
-        )
+    starts = ~ordered.duplicated(keys, keep="first").to_numpy()
+    offsets = np.append(np.flatnonzero(starts), len(ordered)).astype("int64")
+    times = ordered["_t"].to_numpy(dtype="int64")
+    groups = ordered.loc[starts, [employee_key, "Shift", "WorkDay"]].reset_index(drop=True)
+    return groups, times, offsets
 
-    df_proc = df_excel.copy()
-    df_proc["Time"] = pd.to_datetime(df_proc["Time"], errors="coerce")
-    df_proc.dropna(subset=["Time"], inplace=True)
 
-    df_proc["Day_raw"] = df_proc["Time"].dt.date
-    df_proc["WorkDay"] = df_proc.apply(
-        lambda r: r["Day_raw"] - datetime.timedelta(days=1)
-        if r["Time"].hour < 6
-        else r["Day_raw"],
-        axis=1,
+@functools.lru_cache(maxsize=1)
+def _hhmmss_labels():
+    return np.array(
+        [f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in range(86400)],
+        dtype=object,
     )
-    if "Shift" not in df_proc.columns:
-        df_proc["Shift"] = ""
-    df_proc["Shift"] = df_proc["Shift"].fillna("")
 
-    df_turno = df_proc[df_proc["Shift"] != ""].copy()
-    df_sin_turno = df_proc[df_proc["Shift"] == ""].copy()
-    if not df_sin_turno.empty:
-        df_sin_turno.loc[:, "Merged"] = False
-
-    grouped = (
-        df_turno.groupby(["Employee Name", "Shift", "WorkDay"])
-        .agg(
-            checadas_list=(
-                "Time",
-                lambda ts: sorted([pd.to_datetime(t) for t in ts if pd.notnull(t)]),
-            )
-        )
-        .reset_index()
-    )
 
-    def merge_no_shift(gdf, ns_df):
-        res_df = gdf.copy()
-        if "checadas_list" not in res_df.columns:
-            res_df["checadas_list"] = [[] for _ in range(len(res_df))]
+@functools.lru_cache(maxsize=1)
+def _mmss_labels():
+    # ":MM:SS" indexado por minutos * 61 + segundos; incluye el segundo 60
+    # que puede dejar el redondeo
+    return np.array([f":{m:02d}:{s:02d}" for m in range(60) for s in range(61)])
+
+
+def format_time_of_day(times):
+    """Formatea checadas int64 (ns) como "HH:MM:SS" sin crear Timestamps."""
+    seconds_of_day = (times // 1_000_000_000) % 86400
+    return _hhmmss_labels()[seconds_of_day]
+
+
+OVERFLOW_COLUMN = "Checadas excedentes"
+
+
+def pivot_checadas(times, offsets, max_checadas=None):
+    """Convierte las checadas CSR en columnas "Checada 1..N".
+
+    Cada checada recibe su posición dentro del grupo y se coloca en una
+    matriz de ancho N en un solo paso. Con ``max_checadas`` el ancho se limita
+    y las checadas que no caben se cuentan en la columna ``OVERFLOW_COLUMN``.
+    """
+    if max_checadas is not None and max_checadas < 1:
+        raise ValueError("El número máximo de checadas debe ser al menos 1.")
+
+    counts = np.diff(offsets)
+    n_groups = len(counts)
+    width = max(int(counts.max()) if n_groups else 0, 1)
+    if max_checadas is not None:
+        width = min(width, int(max_checadas))
+
+    group_ids = np.repeat(np.arange(n_groups), counts)
+    ranks = np.arange(len(times)) - np.repeat(offsets[:-1], counts)
+    keep = ranks < width
+
+    table = np.full((n_groups, width), None, dtype=object)
+    table[group_ids[keep], ranks[keep]] = format_time_of_day(times[keep])
+    chec_df = pd.DataFrame(table, columns=[f"Checada {i+1}" for i in range(width)])
+    if max_checadas is not None:
+        chec_df[OVERFLOW_COLUMN] = np.maximum(counts - width, 0)
+    return chec_df
+
+
+PUNCH_COLUMNS = ["Employee", "Employee Name", "Time", "Shift"]
+
+# Columna con el código entero del empleado dentro del pipeline
+EMPLOYEE_CODE = "_employee"
+
+
+class EmployeeKeys:
+    """Códigos enteros de empleado asignados una sola vez al leer la entrada.
+
+    Los códigos siguen el orden alfabético de "Employee Name", por lo que
+    ordenar por código equivale a ordenar por nombre. ``names[c]`` e
+    ``ids[c]`` son el nombre y el ID (el de la primera fila de ese nombre, o
+    "" si no hay columna "Employee") del código ``c``. Las filas sin nombre
+    reciben el código -1.
+    """
+
+    def __init__(self, df_punches):
+        codes, names = pd.factorize(df_punches["Employee Name"], sort=True)
+        self.codes = codes.astype("int32")
+        self.names = np.asarray(names, dtype=object)
+        if "Employee" in df_punches.columns:
+            first_rows = np.unique(self.codes, return_index=True)[1]
+            first_rows = first_rows[self.codes[first_rows] >= 0]
+            ids = df_punches["Employee"].iloc[first_rows].reset_index(drop=True)
+            self.ids = ids.fillna("").to_numpy()
         else:
-            res_df["checadas_list"] = res_df["checadas_list"].apply(
-                lambda x: list(x) if isinstance(x, (list, pd.Series)) else []
-            )
+            self.ids = np.full(len(self.names), "", dtype=object)
+
+    def __len__(self):
+        return len(self.names)
+
+
+# Con menos checadas que esto no compensa arrancar procesos
+PARALLEL_MIN_PUNCHES = 100_000
+# Rangos de empleados por proceso: con más de uno, cancelar no espera a que
+# termine todo el cálculo
+SHARDS_PER_WORKER = 4
+
+# Periodos de pago para los acumulados: quincenas (1-15 y 16-fin de mes) o meses
+PAY_PERIODS = ("quincenal", "mensual")
+
+# Acumulados por (empleado, semana, periodo de pago) que se suman en cada nivel
+_SEGMENT_TOTALS = {
+    "worked_ns": ("worked_ns", "sum"),
+    "expected_seconds": ("expected_seconds", "sum"),
+    "first_day": ("first_day", "min"),
+    "last_day": ("last_day", "max"),
+    "days_worked": ("days_worked", "sum"),
+}
+
+
+def _format_seconds(total):
+    """Segundos (float) como "HH:MM:SS"; los nulos o no positivos quedan en "00:00:00"."""
+    total = np.asarray(total, dtype="float64")
+    valid = total > 0
+    hours = np.where(valid, total // 3600, 0).astype("int64")
+    minutes = np.where(valid, total % 3600 // 60, 0).astype("int64")
+    seconds = np.where(valid, np.round(total % 60), 0).astype("int64")
+    # Menos de 24 h se toma de la tabla de etiquetas; el resto une las horas
+    # con ":MM:SS" de ``_mmss_labels``
+    in_table = (hours < 24) & (seconds < 60)
+    labels = _hhmmss_labels()[np.where(in_table, hours * 3600 + minutes * 60 + seconds, 0)]
+    over = np.flatnonzero(~in_table)
+    if len(over):
+        hours_text = np.char.zfill(hours[over].astype(str), 2)
+        labels[over] = np.char.add(hours_text, _mmss_labels()[minutes[over] * 61 + seconds[over]])
+    return labels
+
+
+def format_durations(durations):
+    """Formatea una columna de timedelta como "HH:MM:SS" en una sola pasada.
+
+    Las horas pueden pasar de 99. Los valores nulos o no positivos quedan
+    como "00:00:00" y los segundos se redondean igual que ``round``.
+    """
+    values = pd.Series(durations).to_numpy(dtype="timedelta64[ns]")
+    total = np.where(np.isnat(values), 0, values.view("int64")) / 1e9
+    return _format_seconds(total)
+
+
+def format_signed_seconds(seconds):
+    """Como ``format_durations`` para segundos con signo; los negativos llevan "-"."""
+    seconds = np.asarray(seconds, dtype="float64")
+    labels = _format_seconds(np.abs(seconds))
+    negative = seconds < 0
+    labels[negative] = "-" + labels[negative]
+    return labels
+
+
+def _day_numbers(days):
+    """Fechas como número de días desde 1970-01-01."""
+    return pd.to_datetime(pd.Series(days)).to_numpy(dtype="datetime64[D]").view("int64")
+
+
+def _day_labels(day_numbers):
+    """Números de día como texto "AAAA-MM-DD"."""
+    return np.datetime_as_string(np.asarray(day_numbers, dtype="int64").view("datetime64[D]"), unit="D")
+
+
+def _pay_period_bounds(day_numbers, pay_period):
+    """Primer y último día del periodo de pago de cada día."""
+    months = np.asarray(day_numbers, dtype="int64").view("datetime64[D]").astype("datetime64[M]")
+    month_starts = months.astype("datetime64[D]").view("int64")
+    month_ends = (months + 1).astype("datetime64[D]").view("int64") - 1
+    if pay_period == "mensual":
+        return month_starts, month_ends
+    second_half = day_numbers - month_starts >= 15
+    return (
+        np.where(second_half, month_starts + 15, month_starts),
+        np.where(second_half, month_ends, month_starts + 14),
+    )
 
-        if ns_df.empty:
-            return res_df
-        for idx, row_ns in ns_df.iterrows():
-            time_to_add = pd.to_datetime(row_ns["Time"])
-            mask = (res_df["Employee Name"] == row_ns["Employee Name"]) & (
-                res_df["WorkDay"] == row_ns["WorkDay"]
-            )
-            if mask.any():
-                res_idx = res_df[mask].index[0]
-                current_list = res_df.at[res_idx, "checadas_list"]
-                if time_to_add not in current_list:
-                    res_df.at[res_idx, "checadas_list"] = sorted(current_list + [time_to_add])
-                ns_df.loc[idx, "Merged"] = True
-            else:
-                ns_df.loc[idx, "Merged"] = False
-        extra_df = ns_df[~ns_df["Merged"]]
-        if not extra_df.empty:
-            add_df = (
-                extra_df.groupby(["Employee Name", "WorkDay"])
-                .agg(
-                    checadas_list=(
-                        "Time",
-                        lambda ts: sorted([pd.to_datetime(t) for t in ts if pd.notnull(t)]),
-                    )
-                )
-                .reset_index()
-            )
-            add_df["Shift"] = ""
-            res_df = pd.concat([res_df, add_df], ignore_index=True)
-        return res_df
-
-    grouped = merge_no_shift(grouped, df_sin_turno)
-    grouped.rename(columns={"WorkDay": "Fecha_raw"}, inplace=True)
-    grouped.sort_values(["Employee Name", "Fecha_raw"], inplace=True)
-
-    def calc_actual_worked_hours(lst_times):
-        if not lst_times or len(lst_times) < 2:
-            return pd.Timedelta(0)
-        return lst_times[-1] - lst_times[0]
-
-    grouped["total_timedelta_actual"] = grouped["checadas_list"].apply(calc_actual_worked_hours)
-    fmt_timedelta_to_str = (
-        lambda td: f"{int(td.total_seconds()//3600):02d}:{int(td.total_seconds()%3600//60):02d}:{int(round(td.total_seconds()%60)):02d}"
-        if pd.notnull(td) and td.total_seconds() > 0
-        else "00:00:00"
+
+def _summary_columns(totals):
+    """Columnas de días y horas del resumen a partir de los acumulados."""
+    worked_seconds = totals["worked_ns"].to_numpy(dtype="int64") / 1e9
+    expected_seconds = totals["expected_seconds"].to_numpy(dtype="float64")
+    difference = worked_seconds - expected_seconds
+    return {
+        "Días trabajados": totals["days_worked"].to_numpy(dtype="int64"),
+        "Horas trabajadas": _format_seconds(worked_seconds),
+        "Horas Trabajadas (Segundos)": worked_seconds,
+        "Total Segundos Esperados": expected_seconds,
+        "Diferencia (Segundos)": difference,
+        "Diferencia (HH:MM:SS)": format_signed_seconds(difference),
+    }
+
+
+def summary_rollup(segments, level, employees, pay_period="quincenal"):
+    """Acumulado por empleado y semana (``level="week"``) o periodo de pago (``"pay_period"``).
+
+    ``segments`` es el resumen de ``summarize_employee_days``. Devuelve una
+    fila por empleado y periodo con "Inicio" y "Fin" ("AAAA-MM-DD") y las
+    mismas columnas de horas que la hoja "Resumen".
+    """
+    totals = segments.groupby(level=[EMPLOYEE_CODE, level]).agg(**_SEGMENT_TOTALS)
+    codes = totals.index.get_level_values(0).to_numpy()
+    starts = totals.index.get_level_values(1).to_numpy()
+    if level == "week":
+        ends = starts + 6
+    else:
+        ends = _pay_period_bounds(starts, pay_period)[1]
+    table = pd.DataFrame(
+        {
+            "ID Empleado": employees.ids[codes],
+            "Nombre": employees.names[codes],
+            "Inicio": _day_labels(starts),
+            "Fin": _day_labels(ends),
+            **_summary_columns(totals),
+        }
     )
-    grouped["Horas totales_str"] = grouped["total_timedelta_actual"].apply(fmt_timedelta_to_str)
+    return table.sort_values(["ID Empleado", "Nombre"], kind="mergesort").reset_index(drop=True)
 
-    grouped["Checadas_str_list"] = grouped["checadas_list"].apply(
-        lambda ts: [t.strftime("%H:%M:%S") for t in ts if pd.notnull(t)]
+
+def assign_employee_workdays(df_proc, context):
+    """Agrega ``WorkDay`` a cada checada y descarta las jornadas fuera del periodo."""
+    df_proc = df_proc.assign(
+        WorkDay=assign_workday(
+            df_proc["Time"], df_proc["Shift"], context["workday_cutoff"], context["shift_cutoffs"]
+        )
+    )
+    if context["start_date"]:
+        df_proc = df_proc[df_proc["WorkDay"] >= context["start_date"]]
+    if context["end_date"]:
+        df_proc = df_proc[df_proc["WorkDay"] <= context["end_date"]]
+    return df_proc
+
+
+def group_employee_days(df_proc, instrumentation=None):
+    """Une las checadas sin turno y agrupa por (empleado, jornada, turno).
+
+    ``df_proc`` ya tiene ``WorkDay``. Devuelve ``(groups, times, offsets)``
+    como ``build_punch_groups``, con la jornada en ``Fecha_raw`` y el tiempo
+    trabajado de cada grupo en ``total_timedelta_actual``.
+    """
+    instr = instrumentation or NO_INSTRUMENTATION
+    instr.begin("merge")
+    df_turno = df_proc[df_proc["Shift"] != ""]
+    df_sin_turno = df_proc[df_proc["Shift"] == ""]
+    punches = merge_no_shift(df_turno, df_sin_turno, EMPLOYEE_CODE)
+    instr.end(len(punches))
+
+    instr.begin("group")
+    groups, times, offsets = build_punch_groups(punches, EMPLOYEE_CODE)
+    del df_turno, df_sin_turno, punches
+    groups.rename(columns={"WorkDay": "Fecha_raw"}, inplace=True)
+
+    counts = np.diff(offsets)
+    first_punch = times[offsets[:-1]]
+    last_punch = times[offsets[1:] - 1]
+    groups["total_timedelta_actual"] = pd.to_timedelta(
+        np.where(counts >= 2, last_punch - first_punch, 0), unit="ns"
+    )
+    instr.end(len(groups))
+    return groups, times, offsets
+
+
+def summarize_employee_days(groups, context, progress=None, instrumentation=None):
+    """Completa los grupos con horas esperadas y los acumula en segmentos.
+
+    Un segmento es un (empleado, semana, periodo de pago): ambos periodos
+    se dividen en segmentos, así que el resumen por empleado, por semana y
+    por periodo (``context["pay_period"]``) se obtienen sumando segmentos.
+    Devuelve un DataFrame indexado por (``EMPLOYEE_CODE``, ``week``,
+    ``pay_period``), con el inicio de cada periodo como número de día, y
+    las columnas de ``_SEGMENT_TOTALS``: tiempo trabajado en ns, segundos
+    esperados, primer y último día y días trabajados.
+    """
+    progress = progress or _no_progress
+    instr = instrumentation or NO_INSTRUMENTATION
+    groups["Horas totales_str"] = format_durations(groups["total_timedelta_actual"])
+    days = _day_numbers(groups["Fecha_raw"])
+    # 1970-01-01 fue jueves
+    groups["weekday"] = (days + 3) % 7
+
+    progress("expected_hours")
+    instr.begin("expected_hours")
+    expected_index = context["expected_index"]
+    if expected_index is None:
+        groups["Horas esperadas"] = 0.0
+    else:
+        rows = context["expected_rows"][groups[EMPLOYEE_CODE].to_numpy()]
+        groups["Horas esperadas"] = expected_index.seconds_at(rows, groups["weekday"].to_numpy())
+    instr.end(len(groups))
+
+    progress("summary")
+    instr.begin("employee_summary")
+    segments = pd.DataFrame(
+        {
+            EMPLOYEE_CODE: groups[EMPLOYEE_CODE].to_numpy(),
+            "week": days - groups["weekday"].to_numpy(),
+            "pay_period": _pay_period_bounds(days, context["pay_period"])[0],
+            "day": days,
+            "worked_ns": groups["total_timedelta_actual"].to_numpy(dtype="timedelta64[ns]").view("int64"),
+            "expected_seconds": groups["Horas esperadas"].to_numpy(dtype="float64"),
+        }
+    )
+    segments = segments.groupby([EMPLOYEE_CODE, "week", "pay_period"]).agg(
+        worked_ns=("worked_ns", "sum"),
+        expected_seconds=("expected_seconds", "sum"),
+        first_day=("day", "min"),
+        last_day=("day", "max"),
+        days_worked=("day", "nunique"),
+    )
+    instr.end(len(segments))
+    return segments
+
+
+def compute_employee_days(df_proc, context, progress=None, instrumentation=None):
+    """Núcleo del reporte para un conjunto de empleados completos.
+
+    ``df_proc`` tiene una checada por fila con ``EMPLOYEE_CODE``, ``Time`` y
+    ``Shift``. Asigna la jornada, une las checadas sin turno, agrupa por
+    (empleado, jornada, turno), busca las horas esperadas y resume por
+    empleado. Como ningún paso mezcla empleados distintos, el resultado para
+    un subconjunto de empleados es el mismo que se obtendría con toda la
+    tabla. ``context`` contiene ``expected_index``, ``expected_rows`` (la
+    fila de ``expected_index`` de cada código, ver ``rows_for``),
+    ``workday_cutoff``, ``shift_cutoffs``, ``start_date``, ``end_date`` y
+    ``pay_period``.
+
+    Devuelve ``(groups, times, offsets, segments)`` con los grupos en el
+    formato de ``build_punch_groups`` y el resumen de
+    ``summarize_employee_days``.
+    """
+    instr = instrumentation or NO_INSTRUMENTATION
+    instr.begin("workday")
+    df_proc = assign_employee_workdays(df_proc, context)
+    instr.end(len(df_proc))
+    if df_proc.empty:
+        return None
+
+    groups, times, offsets = group_employee_days(df_proc, instr)
+    del df_proc
+    segments = summarize_employee_days(groups, context, progress, instr)
+    return groups, times, offsets, segments
+
+
+def _concat_employee_days(results):
+    """Une los resultados de ``compute_employee_days`` en el orden dado."""
+    results = [result for result in results if result is not None]
+    if not results:
+        return pd.DataFrame(), np.empty(0, dtype="int64"), np.zeros(1, dtype="int64"), None
+    if len(results) == 1:
+        return results[0]
+    groups = pd.concat([result[0] for result in results], ignore_index=True)
+    times = np.concatenate([result[1] for result in results])
+    offsets = [results[0][2]]
+    for result in results[1:]:
+        offsets.append(result[2][1:] + offsets[-1][-1])
+    segments = pd.concat([result[3] for result in results])
+    return groups, times, np.concatenate(offsets), segments
+
+
+def _shard_count(workers, punch_count, employee_count):
+    if not workers or workers <= 1 or punch_count < PARALLEL_MIN_PUNCHES:
+        return 1
+    return max(1, min(int(workers) * SHARDS_PER_WORKER, employee_count))
+
+
+def _shard_bounds(codes, shards):
+    """Cortes en el orden de los códigos para repartir las checadas en partes parecidas."""
+    per_code = np.bincount(codes)
+    cumulative = np.cumsum(per_code)
+    targets = cumulative[-1] * np.arange(1, shards) / shards
+    cuts = np.searchsorted(cumulative, targets, side="right")
+    return np.unique(np.concatenate([[0], cuts, [len(per_code)]]))
+
+
+_shard_context = None
+
+
+def _init_shard_worker(context):
+    global _shard_context
+    _shard_context = context
+
+
+def _run_shard(df_shard):
+    return compute_employee_days(df_shard, _shard_context)
+
+
+def _run_shards(df_proc, shards, workers, context, progress=None):
+    """Reparte ``df_proc`` por rangos contiguos de empleados entre procesos.
+
+    Los resultados se devuelven en el orden de los rangos, que es el orden de
+    los códigos, así que al unirlos queda el mismo orden que en serie.
+    ``progress("group")`` se llama cada vez que termina un rango; si lanza
+    ``ReportCancelled`` se descartan los rangos pendientes sin esperar a los
+    que ya están en ejecución. Los procesos se inician con "spawn": la
+    interfaz llama desde un hilo mientras Tk y la precarga siguen activos, y
+    un ``fork`` con varios hilos puede dejar bloqueado al proceso hijo.
+    """
+    progress = progress or _no_progress
+    codes = df_proc[EMPLOYEE_CODE].to_numpy()
+    bounds = _shard_bounds(codes, shards)
+    shard_of_row = np.searchsorted(bounds, codes, side="right") - 1
+    frames = [df_proc[shard_of_row == shard] for shard in range(len(bounds) - 1)]
+    pool = ProcessPoolExecutor(
+        max_workers=min(int(workers), len(frames)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_shard_worker,
+        initargs=(context,),
     )
-    max_chec = grouped["Checadas_str_list"].str.len().max()
-    if pd.isna(max_chec) or max_chec == 0:
-        max_chec = 1
-
-    chec_df_data = {}
-    for i in range(int(max_chec)):
-        chec_df_data[f"Checada {i+1}"] = grouped["Checadas_str_list"].apply(
-            lambda x: x[i] if i < len(x) else None
+    try:
+        futures = [pool.submit(_run_shard, frame) for frame in frames]
+        for future in as_completed(futures):
+            future.result()
+            progress("group")
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return [future.result() for future in futures]
+
+
+def _workday_settings(context):
+    """Texto que identifica cómo se asignan las jornadas (para ``PunchStore``)."""
+    shift_cutoffs = context["shift_cutoffs"] or {}
+    per_shift = sorted((str(shift), _cutoff_to_ns(value)) for shift, value in shift_cutoffs.items())
+    return f"{_cutoff_to_ns(context['workday_cutoff'])}|{per_shift}"
+
+
+def _iso_days(days):
+    """Jornadas (``datetime.date``) como texto "AAAA-MM-DD", formateando cada fecha una vez."""
+    days = pd.Series(days)
+    return days.map({day: day.isoformat() for day in days.unique()}).to_numpy()
+
+
+def compute_stored_employee_days(df_proc, employees, context, store, progress=None, instrumentation=None):
+    """Como ``compute_employee_days``, pero recalculando solo lo que cambió.
+
+    Las checadas de ``df_proc`` se agregan a ``store`` (un ``PunchStore``);
+    las que ya estaban cuentan como duplicadas. Solo se agrupan de nuevo
+    las (empleado, jornada) que recibieron checadas nuevas o que no tenían
+    grupos guardados, usando todas sus checadas guardadas. Los grupos de
+    todas las jornadas de ``df_proc`` se leen del almacén.
+
+    Devuelve ``(resultado, estadísticas)``, donde resultado es como el de
+    ``compute_employee_days`` (o None si no hay checadas en el periodo) y
+    estadísticas tiene ``added``, ``duplicates``, ``recomputed_days`` y
+    ``stored_days``.
+    """
+    instr = instrumentation or NO_INSTRUMENTATION
+    instr.begin("workday")
+    df_proc = assign_employee_workdays(df_proc, context)
+    instr.end(len(df_proc))
+    stats = {"added": 0, "duplicates": 0, "recomputed_days": 0, "stored_days": 0}
+    if df_proc.empty:
+        return None, stats
+
+    instr.begin("store_add")
+    store.ensure_settings(
+        _workday_settings(context),
+        lambda times, shifts: assign_workday(
+            times, shifts, context["workday_cutoff"], context["shift_cutoffs"]
+        ),
+    )
+    incoming = pd.DataFrame(
+        {
+            "employee": employees.names[df_proc[EMPLOYEE_CODE].to_numpy()],
+            "time": df_proc["Time"].to_numpy(dtype="datetime64[ns]").view("int64"),
+            "shift": df_proc["Shift"].to_numpy(),
+            "workday": _iso_days(df_proc["WorkDay"].to_numpy()),
+        }
+    )
+    del df_proc
+    stats["added"], stats["duplicates"] = store.add_punches(incoming)
+    instr.end(len(incoming))
+
+    codes_by_name = pd.Index(employees.names)
+    stale = store.stale_days()
+    if not stale.empty:
+        stale_proc = pd.DataFrame(
+            {
+                EMPLOYEE_CODE: codes_by_name.get_indexer(stale["employee"]).astype("int32"),
+                "Time": stale["time"].to_numpy(dtype="int64").view("datetime64[ns]"),
+                "Shift": stale["shift"].to_numpy(),
+                "WorkDay": pd.to_datetime(stale["workday"]).dt.date,
+            }
         )
-    chec_df = pd.DataFrame(chec_df_data, index=grouped.index)
-
-    if "Employee" in df_excel.columns and "Employee Name" in df_excel.columns:
-        id_map = (
-            df_excel[["Employee Name", "Employee"]]
-            .drop_duplicates("Employee Name", keep="first")
-            .set_index("Employee Name")["Employee"]
-            .to_dict()
+        groups, times, offsets = group_employee_days(stale_proc, instr)
+        instr.begin("store_save")
+        stats["recomputed_days"] = len(stale[["employee", "workday"]].drop_duplicates())
+        store.save_days(
+            pd.DataFrame(
+                {
+                    "employee": employees.names[groups[EMPLOYEE_CODE].to_numpy()],
+                    "workday": _iso_days(groups["Fecha_raw"].to_numpy()),
+                    "shift": groups["Shift"].to_numpy(),
+                    "worked": groups["total_timedelta_actual"].to_numpy(dtype="timedelta64[ns]").view("int64"),
+                }
+            ),
+            times,
+            offsets,
         )
-        grouped["ID Empleado_val"] = grouped["Employee Name"].map(id_map).fillna("")
-    else:
-        grouped["ID Empleado_val"] = ""
-
-    report_cols_from_grouped = [
-        "ID Empleado_val",
-        "Employee Name",
-        "Shift",
-        "Fecha_raw",
-        "Horas totales_str",
-    ]
-    for col_name in report_cols_from_grouped:
-        if col_name not in grouped:
-            grouped[col_name] = None if col_name not in ["Shift", "ID Empleado_val"] else ""
-
-    report_df = pd.concat([grouped[report_cols_from_grouped], chec_df], axis=1)
-    report_df.rename(
-        columns={
-            "ID Empleado_val": "ID Empleado",
-            "Employee Name": "Nombre del empleado",
-            "Shift": "Turno",
-            "Fecha_raw": "Fecha",
-            "Horas totales_str": "Horas totales",
-        },
-        inplace=True,
+        instr.end(len(groups))
+
+    instr.begin("store_load")
+    stored = store.load_days()
+    stored[EMPLOYEE_CODE] = codes_by_name.get_indexer(stored["employee"]).astype("int32")
+    stored["Fecha_raw"] = pd.to_datetime(stored["workday"]).dt.date
+    # Mismo orden que build_punch_groups
+    stored = stored.sort_values([EMPLOYEE_CODE, "Fecha_raw", "shift"], kind="mergesort")
+    blobs = stored["times"].tolist()
+    times = np.frombuffer(b"".join(blobs), dtype="int64")
+    offsets = np.concatenate([[0], np.cumsum([len(blob) // 8 for blob in blobs])]).astype("int64")
+    groups = pd.DataFrame(
+        {
+            EMPLOYEE_CODE: stored[EMPLOYEE_CODE].to_numpy(),
+            "Shift": stored["shift"].to_numpy(),
+            "Fecha_raw": stored["Fecha_raw"].to_numpy(),
+            "total_timedelta_actual": pd.to_timedelta(stored["worked"].to_numpy(dtype="int64"), unit="ns"),
+        }
     )
+    stats["stored_days"] = len(stored[["employee", "workday"]].drop_duplicates())
+    del stored, blobs
+    instr.end(len(groups))
 
-    report_df["Fecha"] = pd.to_datetime(report_df["Fecha"], errors="coerce").dt.date
+    segments = summarize_employee_days(groups, context, progress, instr)
+    return (groups, times, offsets, segments), stats
 
-    dias_semana = {0: "Lunes", 1: "Martes", 2: "Miércoles", 3: "Jueves", 4: "Viernes", 5: "Sábado", 6: "Domingo"}
-    report_df["Día"] = pd.to_datetime(report_df["Fecha"]).dt.weekday.map(dias_semana).fillna("")
 
-    report_df["Horas esperadas"] = report_df.apply(
-        lambda row: _get_expected_seconds_for_day(row, expected_hours_df, expected_hours_cache),
+def _read_window(start_date, end_date):
+    """Rango de ``Time`` que puede contener checadas de las jornadas pedidas.
+
+    Una checada de la jornada ``end_date`` puede caer hasta antes de la hora
+    de corte del día siguiente, así que se leen dos días completos de margen.
+    """
+    start = datetime.datetime.combine(start_date, datetime.time()) if start_date else None
+    end = (
+        datetime.datetime.combine(end_date + datetime.timedelta(days=2), datetime.time())
+        if end_date
+        else None
+    )
+    return start, end
+
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def read_punches(src, use_cache=True, start_date=None, end_date=None):
+    """Lee la exportación de checadas y la normaliza.
+
+    Conserva solo las columnas de ``PUNCH_COLUMNS`` y convierte ``Time`` a
+    fecha. Acepta .xlsx (en modo de solo lectura, sin cargar las demás
+    columnas), .csv, .parquet y cualquier otro formato de
+    ``pd.read_excel``; con ``start_date``/``end_date`` las filas claramente
+    fuera del periodo se descartan durante la lectura (el filtro exacto por
+    jornada lo aplica ``generate_report``). Devuelve ``(df, estado)``
+    donde estado es "hit" o "miss" según la caché de entrada, u "off" si no
+    se usó.
+    """
+    window = _read_window(start_date, end_date)
+    variant = None
+    if start_date or end_date:
+        variant = "_".join(d.strftime("%Y%m%d") if d else "" for d in window)
+    key = None
+    if use_cache:
+        try:
+            key = punch_cache.cache_key(src, variant)
+            cached = punch_cache.load(key)
+        except OSError as e:
+            print(f"Advertencia: no se pudo consultar la caché de entrada: {e}")
+            cached = None
+        if cached is not None:
+            return cached, "hit"
+
+    extension = os.path.splitext(src)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        df_punches = read_xlsx_punches(src, PUNCH_COLUMNS, "Time", window)
+    elif extension == ".csv":
+        df_punches = read_csv_punches(src, PUNCH_COLUMNS, "Time", window)
+    elif extension in (".parquet", ".pq"):
+        df_punches = read_parquet_punches(src, PUNCH_COLUMNS, "Time", window)
+    else:
+        df_punches = pd.read_excel(src, usecols=lambda c: c in PUNCH_COLUMNS)
+    if {"Employee Name", "Time"}.difference(df_punches.columns):
+        raise ValueError(
+            "Las columnas requeridas 'Employee Name' y 'Time' no se encontraron."
+        )
+    df_punches = df_punches[[c for c in PUNCH_COLUMNS if c in df_punches.columns]]
+    df_punches["Time"] = pd.to_datetime(df_punches["Time"], errors="coerce")
+
+    if key is None:
+        return df_punches, "off"
+    try:
+        punch_cache.store(key, df_punches)
+    except OSError as e:
+        print(f"Advertencia: no se pudo guardar la caché de entrada: {e}")
+    return df_punches, "miss"
+
+
+def generate_report(
+    src,
+    dst,
+    expected_hours_df=None,
+    expected_hours_cache=None,
+    *,
+    max_checadas=None,
+    progress=None,
+    use_input_cache=True,
+    instrumentation=None,
+    workday_cutoff=DEFAULT_WORKDAY_CUTOFF,
+    shift_cutoffs=None,
+    start_date=None,
+    end_date=None,
+    output_format=None,
+    workers=1,
+    punch_store=None,
+    use_result_cache=True,
+    pay_period="quincenal",
+    excel_styles="cells",
+    return_rollups=False,
+):
+    """Genera el reporte de asistencia de ``src`` en ``dst``.
+
+    ``expected_hours_cache`` se conserva por compatibilidad con llamadas
+    posicionales anteriores y no se usa; las demás opciones se pasan por
+    nombre.
+    ``progress`` se llama con el nombre de cada etapa de ``REPORT_STAGES`` al
+    iniciarla (y periódicamente durante la escritura y, con ``workers``, al
+    terminar cada rango de empleados). Si lanza
+    ``ReportCancelled`` la generación se detiene sin escribir ``dst``.
+    ``instrumentation`` (ver ``instrumentation.Instrumentation``) recibe el
+    inicio y fin de cada etapa interna con su tiempo, filas y memoria.
+    El estado de la caché de entrada queda en ``resumen_df.attrs["input_cache"]``.
+    ``workday_cutoff`` y ``shift_cutoffs`` definen la hora de corte de la
+    jornada (ver ``assign_workday``). ``start_date`` y ``end_date``
+    (``datetime.date``, opcionales) limitan el reporte a las jornadas de ese
+    periodo, inclusive.
+    ``output_format`` es una clave de ``OUTPUT_FORMATS``; por defecto se
+    deduce de la extensión de ``dst``. Con un formato distinto de "xlsx" se
+    escriben las tablas de ``table_output_paths`` y sus rutas quedan en
+    ``resumen_df.attrs["outputs"]``.
+    Con ``workers`` > 1 y al menos ``PARALLEL_MIN_PUNCHES`` checadas, el
+    cálculo por empleado (``compute_employee_days``) se reparte entre ese
+    número de procesos; el resultado es idéntico al cálculo en serie.
+    ``punch_store`` es la ruta de un ``PunchStore``: las checadas se agregan
+    al almacén, solo se recalculan las jornadas con checadas nuevas y el
+    reporte se arma con los grupos guardados para las jornadas de ``src``.
+    Las estadísticas quedan en ``resumen_df.attrs["punch_store"]``.
+    Con ``use_result_cache``, si ya se generó un reporte con la misma entrada,
+    horas esperadas, opciones y ``REPORT_VERSION``, se copia de la caché de
+    ``result_cache``. El estado ("hit", "miss" u "off") queda en
+    ``resumen_df.attrs["result_cache"]``. Con ``punch_store`` la caché no se
+    usa, porque el resultado depende del contenido del almacén.
+    Los acumulados por empleado y semana (lunes a domingo) y por periodo de
+    pago (``pay_period``, una clave de ``PAY_PERIODS``) se escriben como las
+    hojas (o tablas) "Semanal" y "Periodo de pago" (ver ``summary_rollup``).
+    Devuelve el resumen; con ``return_rollups`` devuelve
+    ``(resumen_df, acumulados)``, donde acumulados es un dict de hoja de
+    ``ROLLUP_SHEETS`` a DataFrame.
+    ``excel_styles`` (una clave de ``EXCEL_STYLE_MODES``) elige cómo se
+    aplican los estilos del libro (ver ``write_report_workbook``).
+    """
+    output_format = output_format or output_format_for(dst)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de salida no soportado: '{output_format}'.")
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    if start_date and end_date and start_date > end_date:
+        raise ValueError("La fecha inicial es posterior a la fecha final.")
+    if pay_period not in PAY_PERIODS:
+        raise ValueError(f"Periodo de pago no soportado: '{pay_period}'.")
+    if excel_styles not in EXCEL_STYLE_MODES:
+        raise ValueError(f"Modo de estilos no soportado: '{excel_styles}'.")
+    instr = instrumentation or NO_INSTRUMENTATION
+    progress = progress or _no_progress
+    if output_format == "xlsx":
+        outputs = {"Reporte": dst}
+    else:
+        outputs = table_output_paths(dst, output_format)
+    with output_lock(dst):
+        cache_key = None
+        if use_result_cache and punch_store is None:
+            options = {
+                "max_checadas": max_checadas,
+                "workday_cutoff": _cutoff_to_ns(workday_cutoff),
+                "shift_cutoffs": sorted(
+                    (str(shift), _cutoff_to_ns(value)) for shift, value in (shift_cutoffs or {}).items()
+                ),
+                "start_date": start_date,
+                "end_date": end_date,
+                "output_format": output_format,
+                "pay_period": pay_period,
+                "excel_styles": excel_styles,
+            }
+            instr.begin("result_cache")
+            try:
+                cache_key = result_cache.result_key(src, expected_hours_df, REPORT_VERSION, options)
+                cached = result_cache.load(cache_key, list(outputs.values()))
+            except OSError as e:
+                print(f"Advertencia: no se pudo consultar la caché de reportes: {e}")
+                cached = None
+            instr.end()
+            if cached is not None:
+                resumen_df, rollups = cached
+                if output_format != "xlsx":
+                    resumen_df.attrs["outputs"] = outputs
+                resumen_df.attrs["result_cache"] = "hit"
+                return (resumen_df, rollups) if return_rollups else resumen_df
+        try:
+            resumen_df, rollups = _generate_report(
+                src,
+                dst,
+                expected_hours_df,
+                max_checadas,
+                progress,
+                use_input_cache,
+                instr,
+                workday_cutoff,
+                shift_cutoffs,
+                start_date,
+                end_date,
+                output_format,
+                workers,
+                punch_store,
+                pay_period,
+                excel_styles,
+            )
+        finally:
+            instr.end()
+        resumen_df.attrs["result_cache"] = "off"
+        if cache_key is not None:
+            try:
+                result_cache.store(cache_key, list(outputs.values()), resumen_df, rollups)
+                resumen_df.attrs["result_cache"] = "miss"
+            except OSError as e:
+                print(f"Advertencia: no se pudo guardar la caché de reportes: {e}")
+        return (resumen_df, rollups) if return_rollups else resumen_df
+
+
+def _generate_report(
+    src,
+    dst,
+    expected_hours_df,
+    max_checadas,
+    progress,
+    use_input_cache,
+    instr,
+    workday_cutoff=DEFAULT_WORKDAY_CUTOFF,
+    shift_cutoffs=None,
+    start_date=None,
+    end_date=None,
+    output_format="xlsx",
+    workers=1,
+    punch_store=None,
+    pay_period="quincenal",
+    excel_styles="cells",
+):
+    progress("read")
+    instr.begin("read")
+    df_excel, input_cache_status = read_punches(src, use_input_cache, start_date, end_date)
+    instr.end(len(df_excel))
+
+    progress("group")
+    instr.begin("keys")
+    employees = EmployeeKeys(df_excel)
+    df_proc = pd.DataFrame(
+        {
+            EMPLOYEE_CODE: employees.codes,
+            "Time": pd.to_datetime(df_excel["Time"], errors="coerce"),
+            "Shift": df_excel["Shift"] if "Shift" in df_excel.columns else "",
+        },
+        index=df_excel.index,
+    )
+    # La tabla leída ya no se usa; solo viajan los códigos de empleado
+    del df_excel
+    df_proc = df_proc[(df_proc[EMPLOYEE_CODE] >= 0) & df_proc["Time"].notna()]
+    df_proc["Shift"] = df_proc["Shift"].fillna("")
+    instr.end(len(df_proc))
+
+    expected_index = build_expected_hours_index(expected_hours_df)
+    context = {
+        "expected_index": expected_index,
+        "expected_rows": expected_index.rows_for(employees.ids) if expected_index is not None else None,
+        "workday_cutoff": workday_cutoff,
+        "shift_cutoffs": shift_cutoffs,
+        "start_date": start_date,
+        "end_date": end_date,
+        "pay_period": pay_period,
+    }
+    store_stats = None
+    shards = _shard_count(workers, len(df_proc), len(employees))
+    if punch_store is not None:
+        with PunchStore(punch_store) as store:
+            result, store_stats = compute_stored_employee_days(
+                df_proc, employees, context, store, progress, instr
+            )
+        results = [result]
+    elif shards > 1:
+        instr.begin("shards")
+        results = _run_shards(df_proc, shards, workers, context, progress)
+        instr.end(len(df_proc))
+        # Los procesos calculan las horas esperadas y el resumen de cada
+        # rango; estas etapas se notifican cuando terminan todos
+        progress("expected_hours")
+        progress("summary")
+    else:
+        results = [compute_employee_days(df_proc, context, progress, instr)]
+    del df_proc
+    grouped, times, offsets, segments = _concat_employee_days(results)
+    if grouped.empty:
+        raise ValueError("No se encontraron checadas válidas en el periodo seleccionado.")
+
+    instr.begin("pivot")
+    chec_df = pivot_checadas(times, offsets, max_checadas)
+    chec_df.index = grouped.index
+    instr.end(len(grouped))
+
+    # Los nombres e IDs se materializan solo para las columnas de salida
+    group_codes = grouped[EMPLOYEE_CODE].to_numpy()
+    report_df = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "ID Empleado": employees.ids[group_codes],
+                    "Nombre del empleado": employees.names[group_codes],
+                    "Turno": grouped["Shift"].to_numpy(),
+                    "Fecha": _iso_days(grouped["Fecha_raw"].to_numpy()),
+                    "Horas totales": grouped["Horas totales_str"].to_numpy(),
+                },
+                index=grouped.index,
+            ),
+            chec_df,
+        ],
         axis=1,
     )
 
+    dias_semana = {0: "Lunes", 1: "Martes", 2: "Miércoles", 3: "Jueves", 4: "Viernes", 5: "Sábado", 6: "Domingo"}
+    report_df["Día"] = grouped["weekday"].map(dias_semana).fillna("")
+    report_df["Horas esperadas"] = grouped["Horas esperadas"].to_numpy()
+
     core_cols = [
         "ID Empleado",
         "Nombre del empleado",
@@ -217,6 +1086,8 @@ def generate_report(src, dst, expected_hours_df=None, expected_hours_cache=None)
         [col for col in report_df.columns if col.startswith("Checada ")],
         key=lambda x: int(x.split(" ")[1]),
     )
+    if OVERFLOW_COLUMN in report_df.columns:
+        checada_cols_in_report.append(OVERFLOW_COLUMN)
     final_report_columns_ordered = core_cols + checada_cols_in_report
 
     display_report_df = report_df.copy()
@@ -225,159 +1096,320 @@ def generate_report(src, dst, expected_hours_df=None, expected_hours_cache=None)
             display_report_df[col_name] = None
     display_report_df = display_report_df[final_report_columns_ordered]
 
-    summary_actual = (
-        grouped.groupby(["ID Empleado_val", "Employee Name"])
-        .agg(
-            total_worked_time_sum=("total_timedelta_actual", "sum"),
-            first_day_worked=("Fecha_raw", "min"),
-            last_day_worked=("Fecha_raw", "max"),
-            days_actually_worked=("Fecha_raw", "nunique"),
-        )
-        .reset_index()
+    instr.begin("summary")
+    by_employee = segments.groupby(level=EMPLOYEE_CODE).agg(**_SEGMENT_TOTALS)
+    summary_codes = by_employee.index.to_numpy()
+    resumen_df = pd.DataFrame(
+        {
+            "ID Empleado": employees.ids[summary_codes],
+            "Nombre": employees.names[summary_codes],
+            "Días del periodo": (by_employee["last_day"] - by_employee["first_day"] + 1).to_numpy(),
+            **_summary_columns(by_employee),
+        }
     )
-    summary_actual.rename(
-        columns={"ID Empleado_val": "ID Empleado", "Employee Name": "Nombre"}, inplace=True
+    resumen_df = resumen_df.sort_values(["ID Empleado", "Nombre"], kind="mergesort")
+    summary_codes = summary_codes[resumen_df.index.to_numpy()]
+    resumen_df = resumen_df.reset_index(drop=True)
+    rollups = {
+        sheet: summary_rollup(segments, level, employees, pay_period)
+        for sheet, level in ROLLUP_SHEETS.items()
+    }
+    instr.end(len(resumen_df))
+
+    instr.begin("totals")
+    totals_df = pd.DataFrame(
+        {
+            "ID Empleado": resumen_df["ID Empleado"].to_numpy(),
+            "Nombre del empleado": resumen_df["Nombre"].to_numpy(),
+            "Turno": "Totales",
+            "Fecha": pd.to_numeric(resumen_df["Días trabajados"], errors="coerce").fillna(0).astype("int64"),
+            "Día": "",
+            "Horas esperadas": resumen_df["Total Segundos Esperados"].to_numpy(),
+            "Horas totales": resumen_df["Horas trabajadas"].to_numpy(),
+            **{col: "" for col in checada_cols_in_report},
+        }
+    ).reindex(columns=display_report_df.columns)
+
+    # Cada empleado: sus días por fecha y al final su fila de totales
+    detail_count = len(display_report_df)
+    employee_key = np.concatenate([group_codes, summary_codes])
+    is_total = np.concatenate([np.zeros(detail_count, dtype="int8"), np.ones(len(totals_df), dtype="int8")])
+    day_key = np.concatenate(
+        [
+            pd.to_datetime(grouped["Fecha_raw"]).to_numpy(dtype="datetime64[ns]").view("int64"),
+            np.zeros(len(totals_df), dtype="int64"),
+        ]
     )
+    order = np.lexsort((day_key, is_total, employee_key))
+    final_detail_report_df = (
+        pd.concat([display_report_df, totals_df], ignore_index=True).take(order).reset_index(drop=True)
+    )
+
+    instr.end(len(final_detail_report_df))
 
-    if not report_df.empty and "Horas esperadas" in report_df.columns:
-        total_expected_summary = (
-            report_df.groupby(["ID Empleado", "Nombre del empleado"])["Horas esperadas"]
-            .sum()
-            .reset_index(name="Total Segundos Esperados")
+    if output_format == "xlsx":
+        write_report_workbook(
+            dst, final_detail_report_df, resumen_df, progress, instr, excel_styles, rollups
         )
-        total_expected_summary.rename(columns={"Nombre del empleado": "Nombre"}, inplace=True)
-        resumen_df = pd.merge(summary_actual, total_expected_summary, on=["ID Empleado", "Nombre"], how="left")
-        resumen_df["Total Segundos Esperados"] = resumen_df["Total Segundos Esperados"].fillna(0)
     else:
-        resumen_df = summary_actual.copy()
-        resumen_df["Total Segundos Esperados"] = 0.0
-
-    resumen_df["Días del periodo"] = (
-        resumen_df["last_day_worked"] - resumen_df["first_day_worked"]
-    ).apply(lambda td: td.days + 1 if pd.notnull(td) else 0)
-    resumen_df["Horas trabajadas"] = resumen_df["total_worked_time_sum"].apply(fmt_timedelta_to_str)
-    resumen_df["Horas Trabajadas (Segundos)"] = resumen_df["total_worked_time_sum"].apply(
-        lambda td: td.total_seconds() if pd.notnull(td) else 0
-    )
-    resumen_df["Total Segundos Esperados"] = pd.to_numeric(
-        resumen_df["Total Segundos Esperados"], errors="coerce"
-    ).fillna(0)
-    resumen_df["Diferencia (Segundos)"] = (
-        resumen_df["Horas Trabajadas (Segundos)"] - resumen_df["Total Segundos Esperados"]
-    )
+        resumen_df.attrs["outputs"] = write_report_tables(
+            dst, final_detail_report_df, resumen_df, output_format, progress, instr, rollups
+        )
 
-    def format_seconds_to_hhmmss_with_sign(total_seconds):
-        if pd.isna(total_seconds):
-            return "00:00:00"
-        sign = "-" if total_seconds < 0 else ""
-        total_seconds = abs(total_seconds)
-        h = int(total_seconds // 3600)
-        m = int((total_seconds % 3600) // 60)
-        s = int(round(total_seconds % 60))
-        return f"{sign}{h:02d}:{m:02d}:{s:02d}"
-
-    resumen_df["Diferencia (HH:MM:SS)"] = resumen_df["Diferencia (Segundos)"].apply(
-        format_seconds_to_hhmmss_with_sign
-    )
+    resumen_df.attrs["input_cache"] = input_cache_status
+    if store_stats is not None:
+        resumen_df.attrs["punch_store"] = store_stats
 
-    resumen_df.rename(columns={"days_actually_worked": "Días trabajados"}, inplace=True, errors="ignore")
+    return resumen_df, rollups
 
-    resumen_df_cols_final = [
-        "ID Empleado",
-        "Nombre",
-        "Días del periodo",
-        "Días trabajados",
-        "Horas trabajadas",
-        "Horas Trabajadas (Segundos)",
-        "Total Segundos Esperados",
-        "Diferencia (Segundos)",
-        "Diferencia (HH:MM:SS)",
-    ]
-    for col in resumen_df_cols_final:
-        if col not in resumen_df.columns:
-            default_val = ""
-            if col in [
-                "Días del periodo",
-                "Días trabajados",
-                "Horas Trabajadas (Segundos)",
-                "Total Segundos Esperados",
-                "Diferencia (Segundos)",
-            ]:
-                default_val = 0.0
-            resumen_df[col] = default_val
-
-    resumen_df = resumen_df[resumen_df_cols_final]
-
-    total_rows_for_detail_list = []
-    for _, r_resumen_row in resumen_df.iterrows():
-        emp_name_for_total = r_resumen_row["Nombre"]
-        sum_numeric_expected_seconds_for_emp = r_resumen_row["Total Segundos Esperados"]
-        dias_trabajados_val = (
-            int(r_resumen_row["Días trabajados"]) if pd.notnull(r_resumen_row["Días trabajados"]) else 0
-        )
-        total_row_dict = {
-            "ID Empleado": r_resumen_row.get("ID Empleado", ""),
-            "Nombre del empleado": emp_name_for_total,
-            "Turno": "Totales",
-            "Fecha": dias_trabajados_val,
-            "Día": "",
-            "Horas esperadas": sum_numeric_expected_seconds_for_emp,
-            "Horas totales": r_resumen_row["Horas trabajadas"],
-        }
-        for c_col in checada_cols_in_report:
-            total_row_dict[c_col] = ""
-        total_rows_for_detail_list.append(total_row_dict)
-
-    totals_to_append_df = pd.DataFrame(total_rows_for_detail_list)
-    if not totals_to_append_df.empty:
-        totals_to_append_df = totals_to_append_df.reindex(columns=display_report_df.columns)
-
-    final_detail_sheet_dfs = []
-    if not display_report_df.empty:
-        for emp_name, daily_data_group in display_report_df.groupby("Nombre del empleado", sort=False):
-            final_detail_sheet_dfs.append(daily_data_group.sort_values("Fecha"))
-            emp_total_row = totals_to_append_df[totals_to_append_df["Nombre del empleado"] == emp_name]
-            if not emp_total_row.empty:
-                final_detail_sheet_dfs.append(emp_total_row)
-
-    if not final_detail_sheet_dfs:
-        final_detail_report_df = pd.DataFrame(columns=final_report_columns_ordered)
-    else:
-        final_detail_report_df = pd.concat(final_detail_sheet_dfs, ignore_index=True)
 
-    if "Fecha" in final_detail_report_df.columns:
-        def format_fecha_col(val):
-            if isinstance(val, (datetime.date, pd.Timestamp)):
-                return val.strftime("%Y-%m-%d")
-            return val
+def _min_column_width(header_value):
+    default_min_width = 10 if str(header_value).startswith("Checada") else 12
+    return MIN_COLUMN_WIDTHS.get(header_value, default_min_width)
 
-        final_detail_report_df["Fecha"] = final_detail_report_df["Fecha"].apply(format_fecha_col)
 
-    with pd.ExcelWriter(dst, engine="openpyxl") as writer:
-        final_detail_report_df.to_excel(writer, index=False, sheet_name="Detalle")
-        resumen_df.to_excel(writer, index=False, sheet_name="Resumen")
+def _excel_text_len(value):
+    """Longitud del valor tal como queda guardado en la celda."""
+    if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, np.number)):
+        return len(str(value))
+    text = "%.16g" % value
+    stored = float(text) if ("." in text or "e" in text or "E" in text) else int(text)
+    return len(str(stored))
 
-    return resumen_df
 
+def _column_width(header_value, series):
+    values = series.dropna().unique()
+    max_len = max([len(str(header_value))] + [_excel_text_len(v) for v in values])
+    return max(max_len + 3, _min_column_width(header_value))
 
-def format_excel(path, resumen_data_df=None):
-    wb = load_workbook(path)
 
-    yellow_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-    dark_orange_fill = PatternFill(start_color="1CC0EE", end_color="1CC0EE", fill_type="solid")
+def _styled_cell(ws, value, fill=None, font=None, border=None):
+    cell = WriteOnlyCell(ws, value=value)
+    if fill is not None:
+        cell.fill = fill
+    if font is not None:
+        cell.font = font
+    if border is not None:
+        cell.border = border
+    return cell
 
-    def _format_ws(ws, is_resumen_sheet=False, df_data_for_resumen=None):
-        header_fill = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True)
-        total_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-        bold_font = Font(bold=True)
-        thin = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
+
+def _sheet_layout(df, total_rows=None, cell_fills=None):
+    columns = list(df.columns)
+    widths = [_column_width(col_name, df[col_name]) for col_name in columns]
+    fill_positions = {
+        columns.index(col_name): fills
+        for col_name, fills in (cell_fills or {}).items()
+        if col_name in columns
+    }
+    return widths, total_rows, fill_positions
+
+
+def _header_cell(ws, value, style_name=None):
+    if style_name is None:
+        return _styled_cell(ws, value, HEADER_FILL, HEADER_FONT, THIN_BORDER)
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style_name
+    return cell
+
+
+def _write_styled_sheet(wb, title, df, layout, progress, header_style=None):
+    widths, total_rows, fill_positions = layout
+    ws = wb.create_sheet(title)
+    for c_idx, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(c_idx)].width = width
+
+    ws.append([_header_cell(ws, c, header_style) for c in df.columns])
+
+    for start in range(0, len(df), WRITE_CHUNK_ROWS):
+        progress("write")
+        block = df.iloc[start:start + WRITE_CHUNK_ROWS]
+        rows = block.astype(object).where(block.notna(), None).to_numpy().tolist()
+        for offset, row in enumerate(rows):
+            r_idx = start + offset
+            if total_rows is not None and total_rows[r_idx]:
+                row = [_styled_cell(ws, v, TOTAL_FILL, BOLD_FONT, THIN_BORDER) for v in row]
+            else:
+                for c_pos, fills in fill_positions.items():
+                    if fills[r_idx] is not None:
+                        row[c_pos] = _styled_cell(ws, row[c_pos], fills[r_idx])
+            ws.append(row)
+    return ws
+
+
+def _add_header_style(wb):
+    """Registra en ``wb`` el estilo con nombre del encabezado si no existe."""
+    if HEADER_STYLE_NAME not in wb.named_styles:
+        wb.add_named_style(
+            NamedStyle(name=HEADER_STYLE_NAME, fill=HEADER_FILL, font=HEADER_FONT, border=THIN_BORDER)
+        )
+    return HEADER_STYLE_NAME
+
+
+def add_conditional_formats(ws, columns, row_count):
+    """Reglas de formato condicional para una hoja del reporte.
+
+    Las filas con "Turno" = "Totales" llevan el estilo de totales y la
+    columna "Diferencia (HH:MM:SS)" se colorea según el signo de
+    "Diferencia (Segundos)". ``columns`` son los encabezados de la hoja y
+    ``row_count`` el número de filas de datos.
+    """
+    columns = list(columns)
+    if row_count < 1:
+        return
+    last_row = row_count + 1
+    if "Turno" in columns:
+        turno = get_column_letter(columns.index("Turno") + 1)
+        ws.conditional_formatting.add(
+            f"A2:{get_column_letter(len(columns))}{last_row}",
+            FormulaRule(formula=[f'${turno}2="Totales"'], fill=TOTAL_FILL, font=BOLD_FONT, border=THIN_BORDER),
         )
+    if "Diferencia (HH:MM:SS)" in columns and "Diferencia (Segundos)" in columns:
+        target = get_column_letter(columns.index("Diferencia (HH:MM:SS)") + 1)
+        seconds = get_column_letter(columns.index("Diferencia (Segundos)") + 1)
+        cells = f"{target}2:{target}{last_row}"
+        ws.conditional_formatting.add(cells, FormulaRule(formula=[f"${seconds}2<0"], fill=NEGATIVE_DIFF_FILL))
+        ws.conditional_formatting.add(cells, FormulaRule(formula=[f"${seconds}2>0"], fill=POSITIVE_DIFF_FILL))
+
+
+def output_format_for(dst):
+    """Formato de salida según la extensión de ``dst`` ("xlsx" si no se reconoce)."""
+    extension = os.path.splitext(dst)[1].lower()
+    for output_format, format_extension in OUTPUT_FORMATS.items():
+        if extension == format_extension:
+            return output_format
+    return "xlsx"
+
+
+# Hojas del reporte y el sufijo de su archivo en las salidas tabulares
+REPORT_SHEETS = {
+    "Detalle": "Detalle",
+    "Resumen": "Resumen",
+    "Semanal": "Semanal",
+    "Periodo de pago": "Periodo_de_pago",
+}
+ROLLUP_SHEETS = {"Semanal": "week", "Periodo de pago": "pay_period"}
+
+
+def table_output_paths(dst, output_format):
+    """Rutas de las tablas de ``REPORT_SHEETS`` para una salida tabular."""
+    root = os.path.splitext(dst)[0]
+    extension = OUTPUT_FORMATS[output_format]
+    return {sheet: f"{root}_{suffix}{extension}" for sheet, suffix in REPORT_SHEETS.items()}
+
+
+def _parquet_frame(df):
+    """Copia de ``df`` con las columnas de tipos mezclados convertidas a texto.
+
+    Parquet exige un tipo por columna; por ejemplo "Fecha" lleva los días
+    trabajados en las filas de totales.
+    """
+    df = df.copy()
+    for col_name in df.columns:
+        if df[col_name].dtype != object:
+            continue
+        values = df[col_name].dropna()
+        if values.map(type).nunique() > 1:
+            df[col_name] = df[col_name].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def write_report_tables(
+    dst, detail_df, resumen_df, output_format, progress=None, instrumentation=None, rollups=None
+):
+    """Escribe "Detalle", "Resumen" y los acumulados en CSV, Parquet o JSON-lines.
+
+    Usa las mismas tablas que ``write_report_workbook``, así que los valores
+    coinciden con los del libro. ``rollups`` es un dict de hoja de
+    ``ROLLUP_SHEETS`` a DataFrame. Devuelve el dict de ``table_output_paths``
+    con las tablas escritas.
+    """
+    progress = progress or _no_progress
+    instr = instrumentation or NO_INSTRUMENTATION
+    tables = {"Detalle": detail_df, "Resumen": resumen_df, **(rollups or {})}
+    paths = {sheet: path for sheet, path in table_output_paths(dst, output_format).items() if sheet in tables}
+    progress("write")
+    instr.begin("write")
+    for sheet, df in tables.items():
+        path = paths[sheet]
+        if output_format == "csv":
+            df.to_csv(path, index=False)
+        elif output_format == "parquet":
+            _parquet_frame(df).to_parquet(path, index=False)
+        else:
+            df.to_json(path, orient="records", lines=True, force_ascii=False, date_format="iso")
+    instr.end(sum(len(df) for df in tables.values()))
+    return paths
+
+
+def _difference_fills(df):
+    """Relleno por fila de "Diferencia (HH:MM:SS)" según el signo de "Diferencia (Segundos)"."""
+    if "Diferencia (Segundos)" not in df.columns:
+        return None
+    diferencia = pd.to_numeric(df["Diferencia (Segundos)"], errors="coerce").to_numpy()
+    fills = np.full(len(diferencia), None, dtype=object)
+    fills[diferencia < 0] = NEGATIVE_DIFF_FILL
+    fills[diferencia > 0] = POSITIVE_DIFF_FILL
+    return {"Diferencia (HH:MM:SS)": fills}
+
+
+def write_report_workbook(
+    dst, detail_df, resumen_df, progress=None, instrumentation=None, style_mode="cells", rollups=None
+):
+    """Escribe las hojas "Detalle", "Resumen" y los acumulados ya formateadas.
+
+    Los estilos y anchos de columna se calculan a partir de los DataFrames y
+    el libro se genera en modo ``write_only``, en una sola pasada y sin
+    volver a leer el archivo. ``style_mode`` es una clave de
+    ``EXCEL_STYLE_MODES``. ``rollups`` es un dict de hoja de
+    ``ROLLUP_SHEETS`` a DataFrame; cada uno se escribe como una hoja más,
+    con los mismos colores de diferencia que "Resumen".
+    """
+    sheets = {"Resumen": resumen_df, **(rollups or {})}
+    progress = progress or _no_progress
+    instr = instrumentation or NO_INSTRUMENTATION
+    conditional = style_mode == "conditional"
+    progress("format")
+    instr.begin("format")
+    total_rows = None
+    if "Turno" in detail_df.columns and not conditional:
+        total_rows = (detail_df["Turno"] == "Totales").to_numpy()
+    detail_layout = _sheet_layout(detail_df, total_rows=total_rows)
+
+    layouts = [("Detalle", detail_df, detail_layout)]
+    for title, df in sheets.items():
+        cell_fills = None if conditional else _difference_fills(df)
+        layouts.append((title, df, _sheet_layout(df, cell_fills=cell_fills)))
+    row_count = sum(len(df) for _, df, _ in layouts)
+
+    instr.end(row_count)
+
+    progress("write")
+    instr.begin("write")
+    wb = Workbook(write_only=True)
+    header_style = _add_header_style(wb) if conditional else None
+    for title, df, layout in layouts:
+        ws = _write_styled_sheet(wb, title, df, layout, progress, header_style)
+        if conditional:
+            add_conditional_formats(ws, df.columns, len(df))
+    wb.save(dst)
+    instr.end(row_count)
+
+
+def format_excel(path, resumen_data_df=None, instrumentation=None, style_mode="cells"):
+    """Aplica encabezados, totales, colores de diferencia y anchos a un libro ya escrito.
+
+    Con ``style_mode="conditional"`` el encabezado usa un estilo con nombre
+    y los totales y diferencias se resuelven con ``add_conditional_formats``
+    en lugar de recorrer las celdas.
+    """
+    instr = instrumentation or NO_INSTRUMENTATION
+    instr.begin("load")
+    wb = load_workbook(path)
+    instr.end(sum(wb[name].max_row for name in wb.sheetnames))
+    header_style = _add_header_style(wb) if style_mode == "conditional" else None
 
+    def _format_ws(ws, is_resumen_sheet=False, df_data_for_resumen=None):
         if ws.max_row == 0:
             return
 
@@ -385,22 +1417,29 @@ def format_excel(path, resumen_data_df=None):
 
         for c_idx_plus_1 in range(1, ws.max_column + 1):
             cell = ws.cell(1, c_idx_plus_1)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = thin
+            if header_style is not None:
+                cell.style = header_style
+            else:
+                cell.fill = HEADER_FILL
+                cell.font = HEADER_FONT
+                cell.border = THIN_BORDER
 
-        if ws.title == "Detalle":
+        if header_style is not None:
+            add_conditional_formats(ws, [cell.value for cell in ws[1]], ws.max_row - 1)
+        elif ws.title == "Detalle":
             turno_col_letter = col_names_map.get("Turno")
             if turno_col_letter:
-                for r_idx_plus_1 in range(2, ws.max_row + 1):
-                    if ws[f"{turno_col_letter}{r_idx_plus_1}"].value == "Totales":
-                        for c_idx_plus_1_total in range(1, ws.max_column + 1):
-                            cell_total = ws.cell(r_idx_plus_1, c_idx_plus_1_total)
-                            cell_total.fill = total_fill
-                            cell_total.font = bold_font
-                            cell_total.border = thin
-
-        if is_resumen_sheet and df_data_for_resumen is not None:
+                # ``max_column`` recorre todas las celdas: se calcula una sola vez
+                max_column = ws.max_column
+                for (turno_cell,) in ws[f"{turno_col_letter}2:{turno_col_letter}{ws.max_row}"]:
+                    if turno_cell.value == "Totales":
+                        for c_idx_plus_1_total in range(1, max_column + 1):
+                            cell_total = ws.cell(turno_cell.row, c_idx_plus_1_total)
+                            cell_total.fill = TOTAL_FILL
+                            cell_total.font = BOLD_FONT
+                            cell_total.border = THIN_BORDER
+
+        if header_style is None and is_resumen_sheet and df_data_for_resumen is not None:
             diferencia_hhmmss_col_letter = col_names_map.get("Diferencia (HH:MM:SS)")
             diferencia_segundos_col_name = "Diferencia (Segundos)"
 
@@ -408,16 +1447,15 @@ def format_excel(path, resumen_data_df=None):
                 diferencia_hhmmss_col_letter
                 and diferencia_segundos_col_name in df_data_for_resumen.columns
             ):
-                for r_idx, (_, row_data) in enumerate(df_data_for_resumen.iterrows()):
-                    excel_row_num = r_idx + 2
-                    cell_to_format = ws[f"{diferencia_hhmmss_col_letter}{excel_row_num}"]
-                    diferencia_sec_valor = row_data[diferencia_segundos_col_name]
-
-                    if pd.notnull(diferencia_sec_valor):
-                        if diferencia_sec_valor < 0:
-                            cell_to_format.fill = yellow_fill
-                        elif diferencia_sec_valor > 0:
-                            cell_to_format.fill = dark_orange_fill
+                diferencia = pd.to_numeric(
+                    df_data_for_resumen[diferencia_segundos_col_name], errors="coerce"
+                ).to_numpy()
+                for fill, rows in (
+                    (NEGATIVE_DIFF_FILL, np.flatnonzero(diferencia < 0)),
+                    (POSITIVE_DIFF_FILL, np.flatnonzero(diferencia > 0)),
+                ):
+                    for r_idx in rows:
+                        ws[f"{diferencia_hhmmss_col_letter}{r_idx + 2}"].fill = fill
 
         for col_letter_obj in ws.columns:
             column_letter_str = col_letter_obj[0].column_letter
@@ -431,41 +1469,25 @@ def format_excel(path, resumen_data_df=None):
 
             adjusted_width = max_len + 3
             header_value = ws[f"{column_letter_str}1"].value
-
-            min_widths = {
-                "ID Empleado": 12,
-                "Nombre del empleado": 30,
-                "Nombre": 30,
-                "Turno": 10,
-                "Fecha": 12,
-                "Día": 12,
-                "Horas esperadas": 20,
-                "Horas totales": 15,
-                "Horas trabajadas": 15,
-                "Horas Trabajadas (Segundos)": 22,
-                "Total Segundos Esperados": 22,
-                "Diferencia (Segundos)": 22,
-                "Diferencia (HH:MM:SS)": 22,
-                "Días del periodo": 18,
-                "Días trabajados": 18,
-            }
-
-            default_min_width = 10 if str(header_value).startswith("Checada") else 12
-            adjusted_width = max(adjusted_width, min_widths.get(header_value, default_min_width))
+            adjusted_width = max(adjusted_width, _min_column_width(header_value))
             ws.column_dimensions[column_letter_str].width = adjusted_width
 
     for sheet_name_iter in wb.sheetnames:
         current_ws = wb[sheet_name_iter]
+        instr.begin(f"format_{sheet_name_iter.lower()}")
         if sheet_name_iter == "Resumen":
             _format_ws(current_ws, is_resumen_sheet=True, df_data_for_resumen=resumen_data_df)
         else:
             _format_ws(current_ws)
+        instr.end(current_ws.max_row)
+    instr.begin("save")
     try:
         wb.save(path)
+        instr.end()
     except Exception as e_save:  # pragma: no cover - relies on Excel
-        messagebox.showerror(
-            "Error al guardar",
-            f"No se pudo guardar el archivo Excel:\n{e_save}\n\nAsegúrese de que el archivo no esté abierto.",
-        )
+        instr.end()
         print(f"Error al guardar Excel: {e_save}")
+        raise OSError(
+            f"No se pudo guardar el archivo Excel:\n{e_save}\n\nAsegúrese de que el archivo no esté abierto."
+        ) from e_save
 
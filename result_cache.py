@@ -0,0 +1,127 @@
+"""Caché local de reportes terminados.
+
+La clave combina el hash del archivo de entrada, el hash de la tabla de horas
+esperadas (``get_data_hash``), la versión del reporte y las opciones con que
+se generó. Cada entrada es una carpeta con los archivos de salida, el
+resumen y los acumulados; en un acierto se copian al destino sin volver a calcular nada.
+Las entradas usadas hace más tiempo se desalojan al exceder ``MAX_CACHE_BYTES``.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from expected_hours import get_data_hash
+from punch_cache import file_hash
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "reportes")
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+SUMMARY_FILE = "resumen.pkl"
+ROLLUPS_FILE = "acumulados.pkl"
+
+
+def result_key(src, expected_hours_df, version, options):
+    """Clave de la entrada para ``src`` con la tabla de horas esperadas y las opciones dadas."""
+    expected_hash = get_data_hash(expected_hours_df) if expected_hours_df is not None else "none"
+    payload = json.dumps(
+        {"input": file_hash(src), "expected_hours": expected_hash, "version": version, "options": options},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_dir(key, cache_dir):
+    return os.path.join(cache_dir, key)
+
+
+def _output_name(index, path):
+    return f"salida_{index}{os.path.splitext(path)[1]}"
+
+
+def _copy_atomic(src, dst):
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def load(key, outputs, cache_dir=CACHE_DIR):
+    """Copia la entrada ``key`` a las rutas ``outputs`` y devuelve ``(resumen, acumulados)``.
+
+    Devuelve None si la entrada no existe o está incompleta.
+    """
+    entry = _entry_dir(key, cache_dir)
+    summary_path = os.path.join(entry, SUMMARY_FILE)
+    rollups_path = os.path.join(entry, ROLLUPS_FILE)
+    cached = [os.path.join(entry, _output_name(i, path)) for i, path in enumerate(outputs)]
+    if not all(os.path.exists(path) for path in [summary_path, rollups_path, *cached]):
+        return None
+    try:
+        resumen_df = pd.read_pickle(summary_path)
+        rollups = pd.read_pickle(rollups_path)
+    except Exception as e:
+        print(f"Advertencia: entrada de caché de reportes inválida '{entry}': {e}")
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+    for cached_path, dst in zip(cached, outputs):
+        _copy_atomic(cached_path, dst)
+    # Marca la entrada como usada recientemente para el desalojo
+    os.utime(entry)
+    return resumen_df, rollups
+
+
+def store(key, outputs, resumen_df, rollups, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Guarda los archivos ``outputs``, el resumen y los acumulados (dict de DataFrames).
+
+    Desaloja las entradas más antiguas si se excede el tamaño.
+    """
+    entry = _entry_dir(key, cache_dir)
+    if os.path.isdir(entry):
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = f"{entry}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        for i, path in enumerate(outputs):
+            shutil.copyfile(path, os.path.join(tmp_dir, _output_name(i, path)))
+        resumen_df.to_pickle(os.path.join(tmp_dir, SUMMARY_FILE))
+        pd.to_pickle(rollups, os.path.join(tmp_dir, ROLLUPS_FILE))
+        os.rename(tmp_dir, entry)
+    except OSError:
+        # Otro proceso pudo guardar la misma entrada al mismo tiempo
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(entry):
+            raise
+    evict(cache_dir, max_bytes)
+
+
+def _entry_size(entry):
+    return sum(
+        os.path.getsize(os.path.join(entry, name))
+        for name in os.listdir(entry)
+        if os.path.isfile(os.path.join(entry, name))
+    )
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Elimina las entradas usadas hace más tiempo hasta quedar bajo ``max_bytes``."""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if os.path.isdir(entry) and not name.endswith(".tmp"):
+            try:
+                entries.append((os.stat(entry).st_mtime, _entry_size(entry), entry))
+            except OSError:
+                pass
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
@@ -1,13 +1,17 @@
 import os
 import datetime
+import queue
 import subprocess
+import threading
 import traceback
 
 from tkinter import (
     Tk,
     Label,
     Button,
+    Checkbutton,
     Entry,
+    BooleanVar,
     StringVar,
     filedialog,
     Frame,
@@ -15,21 +19,34 @@ from tkinter import (
     messagebox,
     Toplevel,
 )
-from PIL import Image, ImageTk
 
-import pandas as pd
+from instrumentation import Instrumentation
 
-from expected_hours import load_expected_hours_data
-from report import generate_report, format_excel
+# pandas, openpyxl, PIL y requests se importan bajo demanda (ver ``_warm_up``)
+# para que la ventana aparezca sin esperar a cargarlos.
 
-pd.options.mode.chained_assignment = None
+# Mismo orden que ``report.REPORT_STAGES``
+STAGE_LABELS = {
+    "read": "Leyendo archivo de checadas...",
+    "group": "Agrupando checadas por día...",
+    "expected_hours": "Calculando horas esperadas...",
+    "summary": "Generando resumen...",
+    "format": "Preparando formato...",
+    "write": "Escribiendo reporte...",
+}
+
+INPUT_CACHE_LABELS = {
+    "hit": "entrada leída de caché",
+    "miss": "entrada leída del archivo y guardada en caché",
+    "off": "sin caché",
+}
 
 
 class CheckadorApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Procesador de Checadas")
-        self.root.geometry("750x520")
+        self.root.geometry("750x610")
         self.root.resizable(True, True)
 
         self.primary_color = "#2c3e50"
@@ -43,11 +60,26 @@ class CheckadorApp:
 
         self.root.configure(bg=self.bg_color)
 
-        self.expected_hours_df = load_expected_hours_data()
-        self.expected_hours_cache: dict[str, float] | dict = {}
+        self._expected_hours = None
+        self._expected_hours_lock = threading.Lock()
+        self._warm_up_thread = None
+        self._refresh_result = None
+        self._worker = None
+        self._worker_events = queue.Queue()
+        self._cancel_event = threading.Event()
 
         self.status_frame = Frame(root, bg="#e0e0e0", relief="ridge", bd=1)
         self.status_frame.pack(side="bottom", fill="x")
+        self.expected_hours_badge = Label(
+            self.status_frame,
+            text="Horas esperadas: cargando...",
+            font=("Segoe UI", 9),
+            bg="#e0e0e0",
+            fg=self.text_color,
+            padx=10,
+            pady=8,
+        )
+        self.expected_hours_badge.pack(side="right")
         self.status_label = Label(
             self.status_frame,
             text="Listo para procesar",
@@ -57,7 +89,7 @@ class CheckadorApp:
             padx=10,
             pady=8,
         )
-        self.status_label.pack(fill="x")
+        self.status_label.pack(side="left", fill="x", expand=True)
 
         style = ttk.Style()
         style.configure("TButton", font=("Segoe UI", 10))
@@ -68,6 +100,9 @@ class CheckadorApp:
         self.output_file_name = StringVar(
             value=f"reporte_checador_{datetime.datetime.now().strftime('%d%m%Y')}"
         )
+        self.start_date = StringVar()
+        self.end_date = StringVar()
+        self.use_punch_store = BooleanVar(value=False)
 
         main = Frame(root, bg=self.bg_color, padx=30, pady=20)
         main.pack(fill="both", expand=True)
@@ -75,6 +110,8 @@ class CheckadorApp:
         try:
             logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Logo_asia.png")
             if os.path.exists(logo_path):
+                from PIL import Image, ImageTk
+
                 img = Image.open(logo_path)
                 w, h = img.size
                 nw = 200
@@ -135,6 +172,37 @@ class CheckadorApp:
             side="left"
         )
 
+        row3 = Frame(form, bg=self.bg_color, pady=10)
+        row3.pack(fill="x")
+        Label(
+            row3,
+            text="Periodo (opcional, AAAA-MM-DD):  desde",
+            font=("Segoe UI", 11),
+            bg=self.bg_color,
+            fg=self.text_color,
+        ).pack(side="left", padx=(0, 10))
+        Entry(row3, textvariable=self.start_date, width=12, font=("Segoe UI", 10), bd=1, relief="solid").pack(
+            side="left", ipady=3
+        )
+        Label(row3, text="hasta", font=("Segoe UI", 11), bg=self.bg_color, fg=self.text_color).pack(
+            side="left", padx=10
+        )
+        Entry(row3, textvariable=self.end_date, width=12, font=("Segoe UI", 10), bd=1, relief="solid").pack(
+            side="left", ipady=3
+        )
+
+        row4 = Frame(form, bg=self.bg_color)
+        row4.pack(fill="x")
+        Checkbutton(
+            row4,
+            text="Guardar checadas y recalcular solo las jornadas con checadas nuevas",
+            variable=self.use_punch_store,
+            font=("Segoe UI", 10),
+            bg=self.bg_color,
+            fg=self.text_color,
+            activebackground=self.bg_color,
+        ).pack(side="left")
+
         ttk.Separator(form, orient="horizontal").pack(fill="x", pady=20)
 
         actions = Frame(form, bg=self.bg_color, pady=20)
@@ -151,7 +219,19 @@ class CheckadorApp:
             pady=8,
         )
         self.process_button.pack(pady=10)
-        self.progress = ttk.Progressbar(actions, orient="horizontal", length=500, mode="indeterminate")
+        self.progress = ttk.Progressbar(
+            actions, orient="horizontal", length=500, mode="determinate", maximum=len(STAGE_LABELS)
+        )
+        self.cancel_button = Button(
+            actions,
+            text="Cancelar",
+            command=self.cancel_report,
+            font=("Segoe UI", 10),
+            bg="#95a5a6",
+            fg="white",
+            relief="flat",
+            padx=10,
+        )
 
     def browse_file(self):
         fp = filedialog.askopenfilename(
@@ -179,17 +259,20 @@ class CheckadorApp:
     def _toggle_busy(self, busy: bool):
         if busy:
             self.process_button.configure(state="disabled", text="Procesando...", bg="#95a5a6")
+            self.progress.configure(value=0)
             self.progress.pack(pady=10)
-            self.progress.start(10)
+            self.cancel_button.configure(state="normal")
+            self.cancel_button.pack()
         else:
             self.process_button.configure(state="normal", text="Procesar Archivo", bg=self.secondary_color)
-            self.progress.stop()
             self.progress.pack_forget()
+            self.cancel_button.pack_forget()
 
-    def _show_success_dialog(self, path: str):
+    def _show_success_dialog(self, path: str, timings=None):
+        timings = timings or []
         dlg = Toplevel(self.root)
         dlg.title("Proceso completado")
-        dlg.geometry("450x250")
+        dlg.geometry(f"450x{250 + 18 * len(timings)}")
         dlg.resizable(False, False)
         dlg.configure(bg="white")
         content = Frame(dlg, bg="white", padx=20, pady=10)
@@ -197,6 +280,8 @@ class CheckadorApp:
         try:
             logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Logo_asia.png")
             if os.path.exists(logo_path):
+                from PIL import Image, ImageTk
+
                 img = Image.open(logo_path)
                 w, h = img.size
                 nw = 150
@@ -223,6 +308,20 @@ class CheckadorApp:
         pf.pack(pady=5, fill="x")
         Label(pf, text="Ubicación:", font=("Segoe UI", 10), bg="white").pack(side="left")
         Label(pf, text=short, font=("Segoe UI", 9), fg="#555", bg="white").pack(side="left")
+        if timings:
+            total_seconds = sum(seconds for _, seconds, _ in timings)
+            lines = [f"Tiempo total: {total_seconds:.2f} s"] + [
+                f"{stage}: {seconds:.2f} s" + (f" ({rows} filas)" if rows is not None else "")
+                for stage, seconds, rows in timings
+            ]
+            Label(
+                content,
+                text="\n".join(lines),
+                font=("Consolas", 9),
+                fg="#555",
+                bg="white",
+                justify="left",
+            ).pack(pady=(5, 0), anchor="w")
         bf = Frame(content, bg="white")
         bf.pack(fill="x", pady=10)
 
@@ -258,6 +357,18 @@ class CheckadorApp:
             messagebox.showerror("Error", "Debe seleccionar un archivo de entrada")
             return
 
+        try:
+            start_date = self._parse_date(self.start_date.get())
+            end_date = self._parse_date(self.end_date.get())
+        except ValueError:
+            self._set_status("Fecha inválida", "error")
+            messagebox.showerror("Error", "Las fechas del periodo deben tener el formato AAAA-MM-DD")
+            return
+        if start_date and end_date and start_date > end_date:
+            self._set_status("Periodo inválido", "error")
+            messagebox.showerror("Error", "La fecha inicial es posterior a la fecha final")
+            return
+
         output_filename = self.output_file_name.get().strip() + ".xlsx"
         if os.path.isabs(src) and os.path.isdir(os.path.dirname(src)):
             dst_folder = os.path.dirname(src)
@@ -265,26 +376,177 @@ class CheckadorApp:
             dst_folder = os.path.dirname(os.path.abspath(__file__))
         dst = os.path.join(dst_folder, output_filename)
 
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        self._cancel_event.clear()
+        self._toggle_busy(True)
+        self._set_status("Procesando archivo...", "info")
+        self._worker = threading.Thread(
+            target=self._run_report_worker,
+            args=(src, dst, start_date, end_date, self.use_punch_store.get()),
+            daemon=True,
+        )
+        self._worker.start()
+        self.root.after(100, self._poll_worker)
+
+    def cancel_report(self):
+        if self._worker is not None and self._worker.is_alive():
+            self._cancel_event.set()
+            self.cancel_button.configure(state="disabled")
+            self._set_status("Cancelando...", "warning")
+
+    @property
+    def expected_hours(self):
+        """Almacén de horas esperadas; importa ``expected_hours`` la primera vez."""
+        with self._expected_hours_lock:
+            if self._expected_hours is None:
+                from expected_hours import ExpectedHoursStore
+
+                self._expected_hours = ExpectedHoursStore()
+            return self._expected_hours
+
+    def _warm_up(self):
+        """
+        Carga en segundo plano los módulos pesados y la tabla local de horas
+        esperadas, y después la sincroniza con la API. La tabla nueva reemplaza
+        a la anterior de una sola vez; los reportes en curso conservan la suya.
+        """
         try:
-            self._toggle_busy(True)
-            self._set_status("Procesando archivo...", "info")
-            resumen_df = generate_report(src, dst, self.expected_hours_df, self.expected_hours_cache)
-            format_excel(dst, resumen_df)
-            self._toggle_busy(False)
-            self._set_status("Reporte generado exitosamente", "success")
-            self._show_success_dialog(dst)
-        except ValueError as ve:
-            self._toggle_busy(False)
-            self._set_status(f"Error de valor: {ve}", "error")
+            import pandas as pd
+
+            pd.options.mode.chained_assignment = None
+            import report  # noqa: F401
+
+            store = self.expected_hours
+            store.get()
+            updated = store.refresh()
+            self._refresh_result = (updated, store.last_update())
+        except Exception as e:  # pragma: no cover - se reintenta al generar el reporte
+            print(f"Error precargando datos: {e}")
+            self._refresh_result = (False, None)
+
+    def start_warm_up(self):
+        self._warm_up_thread = threading.Thread(target=self._warm_up, daemon=True)
+        self._warm_up_thread.start()
+        self.root.after(250, self._poll_warm_up)
+
+    def _poll_warm_up(self):
+        if self._refresh_result is None:
+            self.root.after(250, self._poll_warm_up)
+            return
+        updated, last_update = self._refresh_result
+        when = last_update.strftime("%d/%m/%Y %H:%M") if last_update else "sin fecha"
+        if updated:
+            self.expected_hours_badge.configure(
+                text=f"Horas esperadas: actualizadas {when}", fg="white", bg=self.success_color
+            )
+        else:
+            self.expected_hours_badge.configure(
+                text=f"Horas esperadas: datos locales ({when})", fg="white", bg=self.warning_color
+            )
+
+    @staticmethod
+    def _parse_date(text):
+        text = text.strip()
+        if not text:
+            return None
+        return datetime.datetime.strptime(text, "%Y-%m-%d").date()
+
+    def _run_report_worker(self, src, dst, start_date=None, end_date=None, use_punch_store=False):
+        """Genera el reporte fuera del hilo de Tk y publica eventos en la cola."""
+        from punch_store import DEFAULT_STORE_PATH
+        from report import ReportCancelled, generate_report
+
+        events = self._worker_events
+
+        def _progress(stage):
+            if self._cancel_event.is_set():
+                raise ReportCancelled()
+            events.put(("stage", stage))
+
+        instrumentation = Instrumentation()
+        try:
+            # Recarga la tabla si el CSV cambió; el reporte usa esta instantánea
+            expected_hours_df = self.expected_hours.get()
+            resumen_df = generate_report(
+                src,
+                dst,
+                expected_hours_df,
+                progress=_progress,
+                instrumentation=instrumentation,
+                start_date=start_date,
+                end_date=end_date,
+                workers=os.cpu_count() or 1,
+                punch_store=DEFAULT_STORE_PATH if use_punch_store else None,
+            )
+            events.put(
+                (
+                    "done",
+                    (
+                        dst,
+                        resumen_df.attrs.get("input_cache"),
+                        instrumentation.timings(),
+                        resumen_df.attrs.get("punch_store"),
+                        resumen_df.attrs.get("result_cache"),
+                    ),
+                )
+            )
+        except ReportCancelled:
+            events.put(("cancelled", None))
+        except Exception as e:
+            events.put(("error", (e, traceback.format_exc())))
+
+    def _poll_worker(self):
+        while True:
+            try:
+                kind, payload = self._worker_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "stage":
+                if not self._cancel_event.is_set():
+                    self.progress.configure(value=list(STAGE_LABELS).index(payload) + 1)
+                    self._set_status(STAGE_LABELS.get(payload, payload), "info")
+            elif kind == "done":
+                dst, input_cache, timings, store_stats, result_cache = payload
+                self._toggle_busy(False)
+                if result_cache == "hit":
+                    details = "copiado de la caché de reportes"
+                else:
+                    details = INPUT_CACHE_LABELS.get(input_cache, "sin caché")
+                if store_stats:
+                    details += (
+                        f"; {store_stats['duplicates']} checadas duplicadas, "
+                        f"{store_stats['recomputed_days']} de {store_stats['stored_days']} jornadas recalculadas"
+                    )
+                self._set_status(f"Reporte generado exitosamente ({details})", "success")
+                self._show_success_dialog(dst, timings)
+                return
+            elif kind == "cancelled":
+                self._toggle_busy(False)
+                self._set_status("Proceso cancelado", "warning")
+                return
+            else:
+                self._toggle_busy(False)
+                self._show_worker_error(*payload)
+                return
+        self.root.after(100, self._poll_worker)
+
+    def _show_worker_error(self, error, tb):
+        from report import OutputInUseError
+
+        if isinstance(error, OutputInUseError):
+            self._set_status(str(error), "warning")
+            messagebox.showwarning("Reporte en proceso", str(error))
+        elif isinstance(error, ValueError):
+            self._set_status(f"Error de valor: {error}", "error")
             messagebox.showerror(
                 "Error de Valor",
-                f"Ocurrió un error con los datos:\n{ve}\n\n{traceback.format_exc()}",
+                f"Ocurrió un error con los datos:\n{error}\n\n{tb}",
             )
-        except Exception as e:
-            self._toggle_busy(False)
-            self._set_status(f"Error: {e}", "error")
+        else:
+            self._set_status(f"Error: {error}", "error")
             messagebox.showerror(
                 "Error",
-                f"Ocurrió un error inesperado:\n{e}\n\n{traceback.format_exc()}",
+                f"Ocurrió un error inesperado:\n{error}\n\n{tb}",
             )
-